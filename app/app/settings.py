@@ -47,6 +47,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.metrics_middleware',
+    'core.middleware.profiling_middleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -141,4 +143,84 @@ AUTH_USER_MODEL = 'core.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    # orjson for JSON; MessagePack for clients sending
+    # "Accept: application/msgpack".
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.ORJSONRenderer',
+        'core.renderers.MessagePackRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.parsers.ORJSONParser',
+        'core.parsers.MessagePackParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
+
+# Translation
+# Send all segments of a document to the engine in batched requests
+# instead of one request per text node.
+TRANSLATION_BATCH_SEGMENTS = True
+# Reuse translated segments stored in the translation memory table.
+TRANSLATION_MEMORY = True
+# Reuse the result of an identical document translated before, for any
+# user, instead of translating it again. The text of such documents is
+# stored once, in the content store, and referenced by the rows.
+TRANSLATION_CONTENT_STORE = True
+# In-process LRU cache in front of the translation memory. SHARED_CACHE
+# may name an alias from CACHES to add a tier shared between processes.
+TRANSLATION_CACHE = {
+    'MAX_ENTRIES': 10000,
+    'MAX_BYTES': 32 * 1024 * 1024,
+    'TIMEOUT': 60 * 60,
+    'SHARED_CACHE': None,
+}
+# Largest number of documents accepted by the bulk create endpoint.
+TRANSLATION_BULK_MAX_ITEMS = 1000
+# Largest number of target languages of a multi-language translation.
+TRANSLATION_MAX_TARGET_LANGS = 10
+# Rows fetched per round trip by the streaming export.
+TRANSLATION_EXPORT_CHUNK_SIZE = 2000
+# Engine used to translate segments. core.engines.FakeEngine simulates
+# an engine locally; its OPTIONS set latency, error rate and batching.
+# DeepLEngine takes 'timeout', 'pool_size' and 'max_retries'.
+TRANSLATION_ENGINE = {
+    'BACKEND': os.environ.get(
+        'TRANSLATION_ENGINE', 'core.engines.DeepLEngine'
+    ),
+    'OPTIONS': {},
+}
+# 'tokenizer' splices translations into the original HTML and falls back
+# to BeautifulSoup for malformed input; 'soup' always uses BeautifulSoup.
+TRANSLATION_HTML_PARSER = 'tokenizer'
+# Engine requests a single document may have in flight at once on the
+# async (ASGI) translation path.
+TRANSLATION_ASYNC_CONCURRENCY = 8
+# Threads translating the chunks of a single document concurrently on the
+# sync (WSGI) path; 1 translates them one after another.
+TRANSLATION_THREAD_POOL_SIZE = 4
+# Seconds without a heartbeat after which a running job is considered
+# abandoned by its worker and queued again.
+TRANSLATION_JOB_TIMEOUT = 600
+
+# Metrics
+# Clients allowed to read /metrics; '*' allows everyone. Set
+# PROMETHEUS_MULTIPROC_DIR in the environment when running several
+# worker processes, so the metrics of all of them are aggregated.
+METRICS_ALLOWED_IPS = os.environ.get(
+    'METRICS_ALLOWED_IPS', '127.0.0.1,::1'
+).split(',')
+
+# Profiling
+# Directory for cProfile dumps of requests sent with "X-Profile: cprofile"
+# by staff users; unset, only Server-Timing headers are returned.
+PROFILING_DIR = os.environ.get('PROFILING_DIR')
+
+# Health checks
+# Seconds the results of the /readyz database and engine checks are
+# reused, so frequent probes do not add load.
+HEALTH_CHECK_TTL = 5
+# Seconds the engine check may take. It is not retried, so a slow engine
+# makes the process unready instead of holding the probe.
+HEALTH_CHECK_ENGINE_TIMEOUT = 2
@@ -20,6 +20,8 @@ from drf_spectacular.views import (
 from django.contrib import admin
 from django.urls import path, include
 
+from core import views as core_views
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/schema/', SpectacularAPIView.as_view(), name='api-schema'),
@@ -30,4 +32,7 @@ urlpatterns = [
         ),
     path('api/user/', include('user.urls')),
     path('api/translation/', include('translation.urls')),
+    path('metrics', core_views.metrics, name='metrics'),
+    path('healthz', core_views.healthz, name='healthz'),
+    path('readyz', core_views.readyz, name='readyz'),
 ]
@@ -45,3 +45,5 @@ class UserAdmin(BaseUserAdmin):
 
 admin.site.register(models.User, UserAdmin)
 admin.site.register(models.Translation)
+admin.site.register(models.TranslationMemory)
+admin.site.register(models.TranslationContent)
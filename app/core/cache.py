@@ -0,0 +1,201 @@
+"""
+In-process cache for translated segments.
+"""
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+
+from core.metrics import observe_segment_cache
+
+DEFAULT_OPTIONS = {
+    'MAX_ENTRIES': 10000,
+    'MAX_BYTES': 32 * 1024 * 1024,
+    'TIMEOUT': 60 * 60,
+    'SHARED_CACHE': None,
+}
+SHARED_KEY_PREFIX = 'translation-segment:'
+
+
+class SegmentCache:
+    """Thread-safe LRU cache with a TTL and a memory budget.
+
+    Keys are translation memory keys, so entries are specific to the
+    target language. If `shared_cache` names a Django cache alias, it is
+    used as a second tier shared between processes.
+    """
+
+    def __init__(self, max_entries, max_bytes, timeout, shared_cache=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.shared_cache = shared_cache
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._size = 0
+        self._stats = dict.fromkeys([
+            'hits', 'misses', 'evictions', 'expirations',
+            'shared_hits', 'shared_misses',
+        ], 0)
+
+    @staticmethod
+    def _entry_size(key, value):
+        return sys.getsizeof(key) + sys.getsizeof(value)
+
+    def _shared(self):
+        return caches[self.shared_cache] if self.shared_cache else None
+
+    def get_many(self, keys):
+        """Return a mapping of key to value for the cached keys."""
+        found = {}
+        events = dict.fromkeys(['hits', 'misses', 'expirations'], 0)
+        now = time.monotonic()
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and entry[1] < now:
+                    self._discard(key)
+                    events['expirations'] += 1
+                    entry = None
+                if entry is None:
+                    events['misses'] += 1
+                    continue
+                self._entries.move_to_end(key)
+                found[key] = entry[0]
+                events['hits'] += 1
+            self._record(events)
+
+        shared = self._shared()
+        missing = [key for key in keys if key not in found]
+        if shared is not None and missing:
+            shared_found = {
+                key[len(SHARED_KEY_PREFIX):]: value
+                for key, value in shared.get_many(
+                    [SHARED_KEY_PREFIX + key for key in missing]
+                ).items()
+            }
+            with self._lock:
+                self._record({
+                    'shared_hits': len(shared_found),
+                    'shared_misses': len(missing) - len(shared_found),
+                })
+            self._set_local(shared_found)
+            found.update(shared_found)
+
+        return found
+
+    def set_many(self, mapping):
+        """Cache all values of the mapping."""
+        self._set_local(mapping)
+        shared = self._shared()
+        if shared is not None and mapping:
+            shared.set_many(
+                {SHARED_KEY_PREFIX + key: value
+                 for key, value in mapping.items()},
+                timeout=self.timeout,
+            )
+
+    def delete_many(self, keys):
+        """Remove the keys from the local and the shared tier.
+
+        Other processes keep their local entries until they expire.
+        """
+        keys = list(keys)
+        with self._lock:
+            for key in keys:
+                self._discard(key)
+            self._record({})
+        shared = self._shared()
+        if shared is not None and keys:
+            shared.delete_many([SHARED_KEY_PREFIX + key for key in keys])
+
+    def _set_local(self, mapping):
+        expires = time.monotonic() + self.timeout
+        evictions = 0
+        with self._lock:
+            for key, value in mapping.items():
+                size = self._entry_size(key, value)
+                if size > self.max_bytes:
+                    continue
+                self._discard(key)
+                self._entries[key] = (value, expires, size)
+                self._size += size
+            while self._entries and (
+                len(self._entries) > self.max_entries
+                or self._size > self.max_bytes
+            ):
+                key = next(iter(self._entries))
+                self._discard(key)
+                evictions += 1
+            self._record({'evictions': evictions})
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= entry[2]
+
+    def _record(self, events):
+        """Add events to the counters and export them with the usage.
+
+        Called with the lock held.
+        """
+        for name, count in events.items():
+            self._stats[name] += count
+        observe_segment_cache(events, len(self._entries), self._size)
+
+    def clear(self):
+        """Remove all local entries and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            for name in self._stats:
+                self._stats[name] = 0
+            self._record({})
+
+    def stats(self):
+        """Return the hit, miss and eviction counters and the usage."""
+        with self._lock:
+            return dict(
+                self._stats,
+                entries=len(self._entries),
+                bytes=self._size,
+            )
+
+
+_segment_cache = None
+_segment_cache_lock = threading.Lock()
+
+
+def get_segment_cache():
+    """Return the process-wide segment cache configured in settings."""
+    global _segment_cache
+    if _segment_cache is None:
+        with _segment_cache_lock:
+            if _segment_cache is None:
+                options = dict(
+                    DEFAULT_OPTIONS,
+                    **getattr(settings, 'TRANSLATION_CACHE', {}),
+                )
+                _segment_cache = SegmentCache(
+                    max_entries=options['MAX_ENTRIES'],
+                    max_bytes=options['MAX_BYTES'],
+                    timeout=options['TIMEOUT'],
+                    shared_cache=options['SHARED_CACHE'],
+                )
+
+    return _segment_cache
+
+
+def reset_segment_cache(**kwargs):
+    """Drop the cache so it is rebuilt from the current settings."""
+    global _segment_cache
+    if kwargs.get('setting', 'TRANSLATION_CACHE') == 'TRANSLATION_CACHE':
+        with _segment_cache_lock:
+            _segment_cache = None
+
+
+setting_changed.connect(reset_segment_cache)
@@ -0,0 +1,175 @@
+"""
+Documents split into translatable segments.
+"""
+import html
+import re
+
+from bs4 import BeautifulSoup, NavigableString
+from bs4.element import PreformattedString
+
+from django.conf import settings
+
+from core.profiling import phase
+
+# Elements whose text content is code, not prose.
+UNTRANSLATABLE_TAGS = {'script', 'style', 'template'}
+
+
+class PlainTextDocument:
+    """Plain text input, translated as a single segment."""
+
+    def __init__(self, text):
+        self.text = text
+
+    @property
+    def segments(self):
+        return [self.text]
+
+    def render(self, translations):
+        """Return the document with its segment replaced."""
+        return translations[0]
+
+
+class SoupHtmlDocument:
+    """HTML input parsed with BeautifulSoup."""
+
+    def __init__(self, html):
+        self.soup = BeautifulSoup(html, 'html.parser')
+        self._nodes = [
+            node for node in self.soup.descendants
+            if self._is_translatable(node)
+        ]
+
+    @staticmethod
+    def _is_translatable(node):
+        if not isinstance(node, NavigableString):
+            return False
+        # Comments, doctypes, CDATA and processing instructions.
+        if isinstance(node, PreformattedString):
+            return False
+        if node.parent.name in UNTRANSLATABLE_TAGS:
+            return False
+        # Only strings that are the single child of their parent.
+        if node.parent.string is None:
+            return False
+        return bool(node.strip())
+
+    @property
+    def segments(self):
+        return [str(node) for node in self._nodes]
+
+    def render(self, translations):
+        """Splice translations into the tree and return it as HTML."""
+        for index, text in enumerate(translations):
+            replacement = NavigableString(text)
+            self._nodes[index].replace_with(replacement)
+            self._nodes[index] = replacement
+
+        return str(self.soup)
+
+
+class MalformedHtmlError(ValueError):
+    """Raised when the tokenizer cannot make sense of the markup."""
+
+
+class TokenHtmlDocument:
+    """HTML input split into text nodes by a single-pass tokenizer.
+
+    Only the offsets of the text nodes are recorded; rendering splices
+    the translations into the original string, so all other markup stays
+    byte-identical.
+    """
+    TOKEN_RE = re.compile(
+        r"""
+        <!--.*?-->                          # comment
+        | <!\[CDATA\[.*?\]\]>                 # CDATA section
+        | <![^>]*>                          # doctype
+        | <\?[^>]*>                         # processing instruction
+        | </?(?P<tag>[a-zA-Z][^\s/>]*)       # tag name
+          (?:[^>"']|"[^"]*"|'[^']*')*>      # attributes
+        """,
+        re.DOTALL | re.VERBOSE,
+    )
+    # A "<" that starts markup the tokenizer did not recognise.
+    MARKUP_START_RE = re.compile(r'<[a-zA-Z/!?]')
+
+    def __init__(self, html_text):
+        self.html = html_text
+        self._spans = list(self._text_spans(html_text))
+
+    @classmethod
+    def _text_spans(cls, html_text):
+        """Yield (start, end) offsets of the translatable text nodes."""
+        position = 0
+        length = len(html_text)
+        while position < length:
+            match = cls.TOKEN_RE.search(html_text, position)
+            end = match.start() if match else length
+            text = html_text[position:end]
+            if cls.MARKUP_START_RE.search(text):
+                raise MalformedHtmlError(
+                    f'Unexpected markup at offset {position}.'
+                )
+            if text.strip():
+                yield position, end
+            if not match:
+                break
+
+            position = match.end()
+            tag = (match.group('tag') or '').lower()
+            if tag in UNTRANSLATABLE_TAGS and \
+                    not match.group().startswith('</'):
+                # Skip the raw content up to the closing tag.
+                closing = re.compile(rf'</{tag}\s*>', re.IGNORECASE)
+                closing_match = closing.search(html_text, position)
+                if closing_match is None:
+                    raise MalformedHtmlError(f'Unclosed <{tag}> element.')
+                position = closing_match.end()
+
+    @property
+    def segments(self):
+        return [
+            html.unescape(self.html[start:end]) for start, end in self._spans
+        ]
+
+    def render(self, translations):
+        """Return the original HTML with the translations spliced in."""
+        parts = []
+        position = 0
+        for (start, end), text, segment in zip(
+            self._spans, translations, self.segments
+        ):
+            parts.append(self.html[position:start])
+            if text == segment:
+                parts.append(self.html[start:end])
+            else:
+                parts.append(html.escape(text, quote=False))
+            position = end
+        parts.append(self.html[position:])
+
+        return ''.join(parts)
+
+
+def parse_html(text):
+    """Return the document for HTML input.
+
+    The tokenizer is used unless TRANSLATION_HTML_PARSER is 'soup';
+    input it cannot tokenize falls back to BeautifulSoup.
+    """
+    with phase('parse'):
+        if getattr(
+            settings, 'TRANSLATION_HTML_PARSER', 'tokenizer'
+        ) == 'soup':
+            return SoupHtmlDocument(text)
+        try:
+            return TokenHtmlDocument(text)
+        except MalformedHtmlError:
+            return SoupHtmlDocument(text)
+
+
+def parse_document(content_type, text):
+    """Return the document for an input of the given content type."""
+    if content_type == 'plain_text':
+        return PlainTextDocument(text)
+
+    return parse_html(text)
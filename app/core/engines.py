@@ -0,0 +1,338 @@
+"""
+Translation engines.
+"""
+import asyncio
+import os
+import random
+import threading
+import time
+from urllib.parse import urlencode
+
+import httpx
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.utils.module_loading import import_string
+
+from core.segments import MAX_REQUEST_BYTES, MAX_SEGMENTS_PER_REQUEST
+
+DEFAULT_ENGINE = {
+    'BACKEND': 'core.engines.DeepLEngine',
+    'OPTIONS': {},
+}
+
+
+class EngineError(Exception):
+    """Raised when a translation engine fails to translate."""
+
+
+class BaseEngine:
+    """Base class for translation engines.
+
+    `max_segments` and `max_bytes` limit how many segments are sent in a
+    single call to `translate`.
+    """
+    max_segments = MAX_SEGMENTS_PER_REQUEST
+    max_bytes = MAX_REQUEST_BYTES
+
+    def translate(self, texts, *, target_lang, source_lang=None):
+        """Return the translations of a list of texts, in order."""
+        raise NotImplementedError
+
+    def check(self, timeout=None):
+        """Raise EngineError if the engine cannot be reached.
+
+        `timeout` bounds the check in seconds, if the engine supports it.
+        """
+
+    def close(self):
+        """Release connections held by the engine."""
+
+    async def atranslate(self, texts, *, target_lang, source_lang=None):
+        """Translate like `translate` without blocking the event loop.
+
+        Engines without a native async client run `translate` in a
+        worker thread.
+        """
+        return await sync_to_async(self.translate, thread_sensitive=False)(
+            texts, target_lang=target_lang, source_lang=source_lang,
+        )
+
+
+class DeepLEngine(BaseEngine):
+    """Engine backed by the DeepL API.
+
+    `translate` uses the official client; `atranslate` calls the REST
+    API directly with a non-blocking HTTP client. Both clients are
+    created on first use and shared by all threads of the process; they
+    keep up to `pool_size` connections to DeepL alive. `timeout` is the
+    request timeout in seconds, and `max_retries` how often the official
+    client retries failed requests.
+
+    The HTTP client lives on an event loop of its own, in a background
+    thread, and `atranslate` hands its requests over to it. Its pooled
+    connections are bound to that loop, so they outlive the loop of the
+    calling view, which under WSGI is created for every request.
+    """
+    # Status codes DeepL uses for rate limiting and overload.
+    RETRY_STATUS_CODES = {429, 503, 529}
+    MAX_ATTEMPTS = 3
+
+    def __init__(self, auth_key=None, timeout=30.0, pool_size=10,
+                 max_retries=5):
+        self.auth_key = auth_key
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.max_retries = max_retries
+        self._translator = None
+        self._async_client = None
+        self._async_loop = None
+        self._async_thread = None
+        self._lock = threading.Lock()
+
+    def get_auth_key(self):
+        """Return the configured key, the environment or app/config.py."""
+        auth_key = self.auth_key or os.environ.get('DEEPL_AUTH_KEY')
+        if not auth_key:
+            try:
+                from app import config
+            except ImportError:
+                config = None
+            auth_key = getattr(config, 'DEEPL_AUTH_KEY', None)
+        if not auth_key:
+            raise ValueError("DEEPL_AUTH_KEY must be set.")
+
+        return auth_key
+
+    def get_translator(self):
+        """Return the DeepL client, creating it on first use."""
+        if self._translator is None:
+            with self._lock:
+                if self._translator is None:
+                    self._translator = self._create_translator()
+
+        return self._translator
+
+    def _create_translator(self):
+        import deepl
+        from requests.adapters import HTTPAdapter
+
+        # The official client reads these from module globals.
+        deepl.http_client.min_connection_timeout = self.timeout
+        deepl.http_client.max_network_retries = self.max_retries
+        translator = deepl.Translator(self.get_auth_key())
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=self.pool_size,
+        )
+        session = translator._client._session
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+
+        return translator
+
+    def check(self, timeout=None):
+        # The cheapest authenticated request, sent once: the official
+        # client would retry it for minutes while DeepL is down.
+        try:
+            response = httpx.get(
+                f'{self.get_translator().server_url}/v2/usage',
+                headers={
+                    'Authorization': f'DeepL-Auth-Key {self.get_auth_key()}',
+                },
+                timeout=self.timeout if timeout is None else timeout,
+            )
+        except httpx.HTTPError as exc:
+            raise EngineError(str(exc)) from exc
+        if response.status_code != 200:
+            raise EngineError(f'DeepL returned status {response.status_code}.')
+
+    def close(self):
+        with self._lock:
+            if self._translator is not None:
+                self._translator.close()
+                self._translator = None
+            if self._async_loop is not None:
+                asyncio.run_coroutine_threadsafe(
+                    self._async_client.aclose(), self._async_loop,
+                ).result(self.timeout)
+                self._async_loop.call_soon_threadsafe(self._async_loop.stop)
+                self._async_thread.join()
+                self._async_loop.close()
+                self._async_client = None
+                self._async_loop = None
+                self._async_thread = None
+
+    def translate(self, texts, *, target_lang, source_lang=None):
+        from deepl import DeepLException
+
+        try:
+            results = self.get_translator().translate_text(
+                texts, source_lang=source_lang, target_lang=target_lang,
+            )
+        except DeepLException as exc:
+            raise EngineError(str(exc)) from exc
+
+        return [str(result) for result in results]
+
+    def get_async_client(self):
+        """Return the HTTP client and its event loop, starting them first."""
+        if self._async_loop is None:
+            server_url = self.get_translator().server_url
+            auth_key = self.get_auth_key()
+            with self._lock:
+                if self._async_loop is None:
+                    client = httpx.AsyncClient(
+                        base_url=server_url,
+                        headers={
+                            'Authorization': f'DeepL-Auth-Key {auth_key}',
+                        },
+                        timeout=self.timeout,
+                        limits=httpx.Limits(
+                            max_connections=self.pool_size,
+                            max_keepalive_connections=self.pool_size,
+                        ),
+                    )
+                    loop = asyncio.new_event_loop()
+                    self._async_thread = threading.Thread(
+                        target=loop.run_forever,
+                        name='deepl-async',
+                        daemon=True,
+                    )
+                    self._async_thread.start()
+                    self._async_client = client
+                    self._async_loop = loop
+
+        return self._async_client, self._async_loop
+
+    async def atranslate(self, texts, *, target_lang, source_lang=None):
+        client, loop = self.get_async_client()
+        # Cancelling the caller cancels the request on the client's loop.
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(
+            self._atranslate(
+                client, texts, target_lang=target_lang,
+                source_lang=source_lang,
+            ),
+            loop,
+        ))
+
+    async def _atranslate(self, client, texts, *, target_lang, source_lang):
+        data = [('text', text) for text in texts]
+        data.append(('target_lang', target_lang))
+        if source_lang:
+            data.append(('source_lang', source_lang))
+
+        # Repeated `text` fields; httpx only encodes mappings as forms.
+        body = urlencode(data)
+        for attempt in range(1, self.MAX_ATTEMPTS + 1):
+            try:
+                response = await client.post(
+                    '/v2/translate',
+                    content=body,
+                    headers={
+                        'Content-Type': 'application/x-www-form-urlencoded',
+                    },
+                )
+            except httpx.HTTPError as exc:
+                raise EngineError(str(exc)) from exc
+            if response.status_code not in self.RETRY_STATUS_CODES or \
+                    attempt == self.MAX_ATTEMPTS:
+                break
+            await asyncio.sleep(2 ** attempt * random.uniform(0.5, 1))
+
+        if response.status_code != 200:
+            raise EngineError(
+                f'DeepL returned status {response.status_code}: '
+                f'{response.text}'
+            )
+
+        return [
+            translation['text']
+            for translation in response.json()['translations']
+        ]
+
+
+class FakeEngine(BaseEngine):
+    """Local engine for tests, benchmarks and load tests.
+
+    Every call sleeps `latency` seconds plus `char_latency` seconds per
+    character and fails with probability `error_rate`. Translations are
+    built from `template`.
+    """
+
+    def __init__(self, latency=0.0, char_latency=0.0, error_rate=0.0,
+                 max_segments=MAX_SEGMENTS_PER_REQUEST,
+                 max_bytes=MAX_REQUEST_BYTES,
+                 template='[{target_lang}] {text}', seed=None):
+        self.latency = latency
+        self.char_latency = char_latency
+        self.error_rate = error_rate
+        self.max_segments = max_segments
+        self.max_bytes = max_bytes
+        self.template = template
+        self.calls = 0
+        self.characters = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _start(self, texts):
+        """Count a call and return its delay and whether it fails."""
+        characters = sum(len(text) for text in texts)
+        with self._lock:
+            self.calls += 1
+            self.characters += characters
+            failed = self._random.random() < self.error_rate
+
+        return self.latency + characters * self.char_latency, failed
+
+    def _finish(self, texts, target_lang, failed):
+        if failed:
+            raise EngineError('Simulated engine error.')
+
+        return [
+            self.template.format(target_lang=target_lang, text=text)
+            for text in texts
+        ]
+
+    def translate(self, texts, *, target_lang, source_lang=None):
+        delay, failed = self._start(texts)
+        time.sleep(delay)
+
+        return self._finish(texts, target_lang, failed)
+
+    async def atranslate(self, texts, *, target_lang, source_lang=None):
+        delay, failed = self._start(texts)
+        await asyncio.sleep(delay)
+
+        return self._finish(texts, target_lang, failed)
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """Return the process-wide engine configured in settings."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                config = getattr(settings, 'TRANSLATION_ENGINE', None)
+                config = config or DEFAULT_ENGINE
+                backend = import_string(config['BACKEND'])
+                _engine = backend(**config.get('OPTIONS', {}))
+
+    return _engine
+
+
+def reset_engine(**kwargs):
+    """Drop the engine so it is rebuilt from the current settings."""
+    global _engine
+    if kwargs.get('setting', 'TRANSLATION_ENGINE') == 'TRANSLATION_ENGINE':
+        with _engine_lock:
+            if _engine is not None:
+                _engine.close()
+            _engine = None
+
+
+setting_changed.connect(reset_engine)
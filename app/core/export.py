@@ -0,0 +1,70 @@
+"""
+Streaming export of translations.
+
+Rows are read with a server-side cursor and encoded one by one, so
+memory use does not grow with the number of rows exported.
+"""
+import csv
+import zlib
+
+from django.conf import settings
+
+from core.renderers import dumps
+
+EXPORT_FIELDS = [
+    'id', 'content_type', 'target_lang', 'status', 'translation_input',
+    'translation_result', 'error', 'created_at', 'updated_at',
+]
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+def iter_rows(queryset, fields=EXPORT_FIELDS, chunk_size=None):
+    """Yield translations as dicts, fetched `chunk_size` rows at a time."""
+    if chunk_size is None:
+        chunk_size = getattr(settings, 'TRANSLATION_EXPORT_CHUNK_SIZE', 2000)
+
+    return queryset.with_text().values(*fields).iterator(
+        chunk_size=chunk_size
+    )
+
+
+def iter_ndjson(rows):
+    """Yield one JSON document per row."""
+    for row in rows:
+        yield dumps(row) + b'\n'
+
+
+class _Line:
+    """File-like object returning what csv.writer writes to it."""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows, fields=EXPORT_FIELDS):
+    """Yield a CSV header and one line per row."""
+    writer = csv.writer(_Line())
+    yield writer.writerow(fields).encode()
+    for row in rows:
+        yield writer.writerow([row[field] for field in fields]).encode()
+
+
+def iter_export(rows, export_format, fields=EXPORT_FIELDS):
+    """Yield the rows encoded in the given format."""
+    if export_format == 'csv':
+        return iter_csv(rows, fields)
+
+    return iter_ndjson(rows)
+
+
+def iter_gzip(chunks):
+    """Yield the chunks compressed as a single gzip stream."""
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
@@ -0,0 +1,87 @@
+"""
+Health checks for the database and the translation engine.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+
+from core.engines import get_engine
+
+
+def probe_database(alias='default'):
+    """Run a trivial query, raising if the database is unreachable."""
+    with connections[alias].cursor() as cursor:
+        cursor.execute('SELECT 1')
+
+
+def probe_engine():
+    """Raise if the translation engine is unreachable."""
+    get_engine().check(
+        timeout=getattr(settings, 'HEALTH_CHECK_ENGINE_TIMEOUT', 2),
+    )
+
+
+CHECKS = {
+    'database': probe_database,
+    'engine': probe_engine,
+}
+
+_results = {}
+# One lock per check, so a slow engine does not hold the database check.
+_locks = {name: threading.Lock() for name in CHECKS}
+
+
+def _probe(name):
+    """Run a check and return its result.
+
+    Only the type of a failure is reported, not its message, which may
+    contain host names or credentials.
+    """
+    start = time.perf_counter()
+    try:
+        CHECKS[name]()
+    except Exception as exc:
+        result = {'ok': False, 'error': type(exc).__name__}
+    else:
+        result = {'ok': True}
+    result['duration_ms'] = round((time.perf_counter() - start) * 1000, 1)
+
+    return result
+
+
+def _fresh(cached):
+    ttl = getattr(settings, 'HEALTH_CHECK_TTL', 5)
+    return cached is not None and time.monotonic() - cached[0] < ttl
+
+
+def run_check(name):
+    """Return the result of a check, cached for HEALTH_CHECK_TTL seconds.
+
+    Only one thread runs a check at a time. While it does, other threads
+    get the last result, or wait for this one if there is none yet.
+    """
+    cached = _results.get(name)
+    if _fresh(cached):
+        return cached[1]
+
+    lock = _locks[name]
+    if not lock.acquire(blocking=cached is None):
+        return cached[1]
+    try:
+        # Another thread may have refreshed it while this one waited.
+        cached = _results.get(name)
+        if _fresh(cached):
+            return cached[1]
+        result = _probe(name)
+        _results[name] = (time.monotonic(), result)
+    finally:
+        lock.release()
+
+    return result
+
+
+def clear_results():
+    """Forget cached results, so the next probe runs the checks."""
+    _results.clear()
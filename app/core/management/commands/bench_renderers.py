@@ -0,0 +1,120 @@
+"""
+Django command to benchmark the API renderers.
+"""
+import json
+import platform
+import statistics
+import sys
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from rest_framework.renderers import JSONRenderer
+
+from core.management.commands.bench_translation import (
+    generate_html,
+    git_revision,
+)
+from core.models import Translation
+from core.renderers import MessagePackRenderer, ORJSONRenderer
+from translation.serializers import TranslationSerializer
+
+RENDERERS = {
+    'json': JSONRenderer,
+    'orjson': ORJSONRenderer,
+    'msgpack': MessagePackRenderer,
+}
+
+
+def list_response(items, size):
+    """Return a translation list page of `items` documents of `size` bytes.
+
+    The rows are not saved; they are serialized like the list endpoint
+    serializes them.
+    """
+    user = get_user_model()(email='bench@example.com')
+    translations = []
+    for i in range(items):
+        html = generate_html(size, seed=i)
+        translations.append(Translation(
+            id=i + 1,
+            user=user,
+            content_type='html',
+            translation_input=html,
+            translation_result=html.replace('e', 'é'),
+        ))
+
+    return {
+        'next': None,
+        'previous': None,
+        'results': TranslationSerializer(translations, many=True).data,
+    }
+
+
+class Command(BaseCommand):
+    """Django command to benchmark API renderers."""
+    help = 'Benchmark render time and payload size of list responses.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--items', type=int, default=50,
+            help='Translations per list page.',
+        )
+        parser.add_argument(
+            '--sizes', default='1,10,100',
+            help='Comma-separated document sizes in KB.',
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=5,
+            help='Runs per renderer; the median is reported.',
+        )
+        parser.add_argument(
+            '--output', help='Write the JSON report to this file.',
+        )
+
+    def benchmark(self, data, renderer, repeat):
+        """Return the median render time and the payload size."""
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            payload = renderer.render(data, renderer.media_type)
+            timings.append(time.perf_counter() - start)
+
+        return {
+            'payload_bytes': len(payload),
+            'render_seconds': statistics.median(timings),
+        }
+
+    def handle(self, *args, **options):
+        """Command Entrypoint"""
+        results = []
+        for size in [int(kb) * 1024 for kb in options['sizes'].split(',')]:
+            data = list_response(options['items'], size)
+            for name, renderer_class in RENDERERS.items():
+                result = self.benchmark(
+                    data, renderer_class(), options['repeat']
+                )
+                result.update(
+                    renderer=name, items=options['items'], size_bytes=size,
+                )
+                results.append(result)
+                self.stderr.write(
+                    f"{name:>8} "
+                    f"{options['items']:>4} x {size:>7} bytes  "
+                    f"payload {result['payload_bytes']:>10} bytes  "
+                    f"render {result['render_seconds']:.4f}s"
+                )
+
+        report = json.dumps({
+            'benchmark': 'api_renderers',
+            'revision': git_revision(),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'results': results,
+        }, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                output.write(report + '\n')
+        else:
+            self.stdout.write(report)
@@ -0,0 +1,233 @@
+"""
+Django command to benchmark the HTML translation pipeline.
+"""
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from core.documents import parse_html
+from core.engines import get_engine
+from core.models import Translation
+from core.segments import translate_segments
+
+WORDS = (
+    'translation document editor paragraph headline content page news '
+    'customer service product release update privacy legal notice team '
+    'welcome contact support account order delivery payment newsletter'
+).split()
+
+BLOCKS = [
+    "<h2 class='editor-heading-h2' dir='ltr'><span>{}</span></h2>",
+    "<p class='editor-paragraph' dir='ltr'><span>{}</span></p>",
+    "<p class='editor-paragraph' dir='ltr'><span>{} </span><b>"
+    "<strong class='editor-text-bold'>{}</strong></b><span> {}</span></p>",
+    "<ul><li>{}</li><li>{}</li></ul>",
+    "<p class='editor-paragraph' dir='ltr'><br></p>",
+]
+
+
+def generate_html(size, seed=0):
+    """Return an editor-like HTML document of roughly `size` bytes.
+
+    About a third of the sentences repeat, like boilerplate does.
+    """
+    rng = random.Random(seed)
+    boilerplate = [
+        ' '.join(rng.choices(WORDS, k=8)).capitalize() for _ in range(20)
+    ]
+
+    def sentence():
+        if rng.random() < 0.3:
+            return rng.choice(boilerplate)
+        return ' '.join(rng.choices(WORDS, k=rng.randint(3, 15)))
+
+    parts = []
+    length = 0
+    while length < size:
+        block = rng.choice(BLOCKS)
+        part = block.format(*(sentence() for _ in range(block.count('{}'))))
+        parts.append(part)
+        length += len(part)
+
+    return ''.join(parts)
+
+
+# The engine is faked, and the translation memory and segment cache are
+# disabled, so every run translates all segments again.
+BENCHMARK_SETTINGS = {
+    'TRANSLATION_ENGINE': {
+        'BACKEND': 'core.engines.FakeEngine',
+        'OPTIONS': {},
+    },
+    'TRANSLATION_MEMORY': False,
+    'TRANSLATION_CACHE': {
+        'MAX_ENTRIES': 0,
+        'MAX_BYTES': 0,
+        'TIMEOUT': 0,
+        'SHARED_CACHE': None,
+    },
+}
+PARSERS = ['soup', 'tokenizer']
+
+
+def run_pipeline(html):
+    """Translate the document once, timing every phase.
+
+    The phases are the steps `Translation.translate_html` takes, run
+    with the same functions.
+    """
+    engine = get_engine()
+    timings = {}
+    start = time.perf_counter()
+    document = parse_html(html)
+    timings['parse'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    segments = document.segments
+    timings['traverse'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    translations = translate_segments(
+        segments, engine, target_lang='DE', content_type='html',
+    )
+    timings['translate'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    document.render(translations)
+    timings['serialize'] = time.perf_counter() - start
+
+    return timings, len(segments)
+
+
+def run_translate_html(html):
+    """Translate the document once with the model, returning its time."""
+    translation = Translation(
+        translation_input=html, content_type='html', target_lang='DE',
+    )
+    start = time.perf_counter()
+    translation.translate_html()
+
+    return time.perf_counter() - start
+
+
+def git_revision():
+    """Return the current git commit, if available."""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    """Django command to benchmark HTML translation."""
+    help = 'Benchmark parsing, traversal, translation and serialization.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', default='1,10,100,1000,10000',
+            help='Comma-separated document sizes in KB.',
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=3,
+            help='Runs per document size; the median is reported.',
+        )
+        parser.add_argument(
+            '--parser', choices=[*PARSERS, 'all'], default='all',
+            help='HTML parser to benchmark.',
+        )
+        parser.add_argument(
+            '--no-batch-segments', action='store_true',
+            help='Translate segment by segment, as with '
+                 'TRANSLATION_BATCH_SEGMENTS = False.',
+        )
+        parser.add_argument(
+            '--output', help='Write the JSON report to this file.',
+        )
+
+    def benchmark(self, html, repeat):
+        """Return the median timings, engine calls and peak memory."""
+        runs = [run_pipeline(html) for _ in range(repeat)]
+
+        engine = get_engine()
+        calls = engine.calls
+        translate_html_seconds = statistics.median(
+            run_translate_html(html) for _ in range(repeat)
+        )
+        calls = engine.calls - calls
+
+        tracemalloc.start()
+        run_translate_html(html)
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        result = {
+            'size_bytes': len(html.encode()),
+            'nodes': runs[0][1],
+            'engine_calls': calls // repeat,
+            'peak_memory_bytes': peak_memory,
+        }
+        for phase in runs[0][0]:
+            result[f'{phase}_seconds'] = statistics.median(
+                timings[phase] for timings, _ in runs
+            )
+        result['translate_html_seconds'] = translate_html_seconds
+
+        return result
+
+    def handle(self, *args, **options):
+        """Command Entrypoint"""
+        if options['parser'] == 'all':
+            parsers = PARSERS
+        else:
+            parsers = [options['parser']]
+        batch_segments = not options['no_batch_segments'] and getattr(
+            settings, 'TRANSLATION_BATCH_SEGMENTS', True
+        )
+
+        results = []
+        for size in [int(kb) * 1024 for kb in options['sizes'].split(',')]:
+            html = generate_html(size)
+            for parser in parsers:
+                with override_settings(
+                    TRANSLATION_HTML_PARSER=parser,
+                    TRANSLATION_BATCH_SEGMENTS=batch_segments,
+                    **BENCHMARK_SETTINGS,
+                ):
+                    result = self.benchmark(html, options['repeat'])
+                result['parser'] = parser
+                results.append(result)
+                self.stderr.write(
+                    f"{parser:>9} "
+                    f"{result['size_bytes']:>10} bytes  "
+                    f"{result['nodes']:>7} nodes  "
+                    f"parse {result['parse_seconds']:.4f}s  "
+                    f"serialize {result['serialize_seconds']:.4f}s  "
+                    f"translate_html "
+                    f"{result['translate_html_seconds']:.4f}s"
+                )
+
+        report = json.dumps({
+            'benchmark': 'translation_html',
+            'revision': git_revision(),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'batch_segments': batch_segments,
+            'results': results,
+        }, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                output.write(report + '\n')
+        else:
+            self.stdout.write(report)
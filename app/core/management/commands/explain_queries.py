@@ -0,0 +1,114 @@
+"""
+Django command to capture query plans of the hot API queries.
+"""
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from core.models import STATUS_PENDING, Translation, TranslationMemory
+from core.segments import segment_key
+
+
+def hot_queries(user):
+    """Return the named querysets the API runs most often."""
+    keys = [segment_key(f'Segment {i}', 'DE', 'html') for i in range(50)]
+
+    return {
+        'translation_list_page': Translation.objects.with_content().filter(
+            user=user
+        ).order_by('-id')[:51],
+        'translation_list_projection': Translation.objects.filter(
+            user=user
+        ).order_by('-id').only('id', 'status')[:51],
+        'translation_retrieve': Translation.objects.with_content().filter(
+            user=user, pk=Translation.objects.filter(
+                user=user
+            ).values('pk').order_by('pk')[:1],
+        ),
+        'translation_claim_pending': Translation.objects.filter(
+            status=STATUS_PENDING
+        ).order_by('id').values('id')[:10],
+        'translation_memory_lookup': TranslationMemory.objects.filter(
+            key__in=keys
+        ).values_list('key', 'target_text'),
+    }
+
+
+class Command(BaseCommand):
+    """Django command to print EXPLAIN (ANALYZE, BUFFERS) plans."""
+    help = 'Capture query plans of the hot API queries.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Insert this many translations and memory segments for a '
+                 'throwaway user first; they are rolled back afterwards.',
+        )
+        parser.add_argument(
+            '--email', help='Explain the queries for this existing user.',
+        )
+        parser.add_argument(
+            '--output', help='Write the JSON report to this file.',
+        )
+
+    def seed(self, count):
+        """Insert sample rows and return their user."""
+        user = get_user_model().objects.create_user(
+            'explain-queries@example.com', None,
+        )
+        for start in range(0, count, 10000):
+            size = min(10000, count - start)
+            Translation.objects.bulk_create(
+                Translation(
+                    user=user,
+                    content_type='html',
+                    translation_input=f'<p>Segment {start + i}</p>',
+                    translation_result=f'<p>Segment {start + i}</p>',
+                    status=STATUS_PENDING if i % 100 == 0 else 'done',
+                )
+                for i in range(size)
+            )
+            TranslationMemory.objects.store(
+                [
+                    (segment_key(f'Segment {start + i}', 'DE', 'html'),
+                     f'Segment {start + i}', f'Segment {start + i}')
+                    for i in range(size)
+                ],
+                source_lang='', target_lang='DE', content_type='html',
+            )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'ANALYZE {Translation._meta.db_table}, '
+                f'{TranslationMemory._meta.db_table}'
+            )
+
+        return user
+
+    def handle(self, *args, **options):
+        """Command Entrypoint"""
+        with transaction.atomic():
+            if options['seed']:
+                user = self.seed(options['seed'])
+            elif options['email']:
+                user = get_user_model().objects.get(email=options['email'])
+            else:
+                user = get_user_model().objects.order_by('id').first()
+
+            plans = {
+                name: queryset.explain(analyze=True, buffers=True)
+                for name, queryset in hot_queries(user).items()
+            }
+            # Never keep seeded rows.
+            transaction.set_rollback(True)
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(plans, output, indent=2)
+                output.write('\n')
+            return
+
+        for name, plan in plans.items():
+            self.stdout.write(self.style.SUCCESS(name))
+            self.stdout.write(plan + '\n')
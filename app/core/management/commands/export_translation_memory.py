@@ -0,0 +1,65 @@
+"""
+Django command to export the translation memory.
+"""
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core import memory_files
+from core.models import CONTENT_TYPE_CHOICES
+
+
+class Command(BaseCommand):
+    """Django command to write the memory of a language as TSV or TMX."""
+    help = 'Stream the translation memory of a language as TSV or TMX.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--format', dest='file_format',
+            choices=memory_files.FORMATS, default='tsv',
+            help='File format.',
+        )
+        parser.add_argument(
+            '--source-lang', default='',
+            help='Language code written for the source variants in TMX.',
+        )
+        parser.add_argument(
+            '--target-lang', required=True, help='Language translated to.',
+        )
+        parser.add_argument(
+            '--content-type', default='html',
+            choices=[choice for choice, _ in CONTENT_TYPE_CHOICES],
+            help='Content type the segments are used for.',
+        )
+        parser.add_argument(
+            '--output', help='Write to this file instead of stdout.',
+        )
+
+    def handle(self, *args, **options):
+        """Command Entrypoint"""
+        if connection.vendor != 'postgresql':
+            raise CommandError('Exporting requires PostgreSQL.')
+
+        output = sys.stdout.buffer
+        if options['output']:
+            output = open(options['output'], 'wb')
+        try:
+            if options['file_format'] == 'tmx':
+                count = memory_files.export_tmx(
+                    output,
+                    source_lang=options['source_lang'],
+                    target_lang=options['target_lang'].upper(),
+                    content_type=options['content_type'],
+                )
+            else:
+                count = memory_files.export_tsv(
+                    output,
+                    target_lang=options['target_lang'].upper(),
+                    content_type=options['content_type'],
+                )
+        finally:
+            if output is not sys.stdout.buffer:
+                output.close()
+
+        self.stderr.write(f'Exported {count} entries.')
@@ -0,0 +1,54 @@
+"""
+Django command to export translations.
+"""
+import sys
+
+from django.core.management.base import BaseCommand
+
+from core import export
+from core.models import Translation
+
+
+class Command(BaseCommand):
+    """Django command to export translations as NDJSON or CSV."""
+    help = 'Stream translations to a file or stdout as NDJSON or CSV.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--email', help='Only export the translations of this user.',
+        )
+        parser.add_argument(
+            '--format', dest='export_format',
+            choices=list(export.FORMATS), default='ndjson',
+            help='Export format.',
+        )
+        parser.add_argument(
+            '--gzip', action='store_true', help='Compress with gzip.',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=None,
+            help='Rows fetched per round trip.',
+        )
+        parser.add_argument(
+            '--output', help='Write to this file instead of stdout.',
+        )
+
+    def handle(self, *args, **options):
+        """Command Entrypoint"""
+        queryset = Translation.objects.order_by('id')
+        fields = export.EXPORT_FIELDS
+        if options['email']:
+            queryset = queryset.filter(user__email=options['email'])
+        else:
+            fields = ['user__email', *fields]
+
+        rows = export.iter_rows(queryset, fields, options['chunk_size'])
+        content = export.iter_export(rows, options['export_format'], fields)
+        if options['gzip']:
+            content = export.iter_gzip(content)
+
+        if options['output']:
+            with open(options['output'], 'wb') as output:
+                output.writelines(content)
+        else:
+            sys.stdout.buffer.writelines(content)
@@ -0,0 +1,84 @@
+"""
+Django command to import translation memory files.
+"""
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core import memory_files
+from core.models import CONTENT_TYPE_CHOICES
+
+
+class Command(BaseCommand):
+    """Django command to load TSV or TMX files into the memory."""
+    help = (
+        'Stream a TSV or TMX file into the translation memory, replacing '
+        'the translations of known segments.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', help='File to import, or - to read from stdin.',
+        )
+        parser.add_argument(
+            '--format', dest='file_format',
+            choices=memory_files.FORMATS, default=None,
+            help='File format; guessed from the file name if omitted.',
+        )
+        parser.add_argument(
+            '--source-lang', default='',
+            help='Language of the source variant in TMX files.',
+        )
+        parser.add_argument(
+            '--target-lang', required=True, help='Language translated to.',
+        )
+        parser.add_argument(
+            '--content-type', default='html',
+            choices=[choice for choice, _ in CONTENT_TYPE_CHOICES],
+            help='Content type the segments are used for.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=50000,
+            help='Entries copied and merged per transaction.',
+        )
+
+    def handle(self, *args, **options):
+        """Command Entrypoint"""
+        if connection.vendor != 'postgresql':
+            raise CommandError('Importing requires PostgreSQL.')
+        file_format = options['file_format'] or (
+            'tmx' if options['path'].lower().endswith('.tmx') else 'tsv'
+        )
+        if file_format == 'tmx' and not options['source_lang']:
+            raise CommandError('--source-lang is required for TMX files.')
+        target_lang = options['target_lang'].upper()
+
+        if options['path'] == '-':
+            source = sys.stdin.buffer
+        else:
+            source = open(options['path'], 'rb')
+        progress = memory_files.Progress(self.stderr, 'Imported')
+        try:
+            pairs = memory_files.read_pairs(
+                source,
+                file_format,
+                source_lang=options['source_lang'],
+                target_lang=target_lang,
+            )
+            entries = memory_files.iter_entries(
+                pairs,
+                target_lang=target_lang,
+                content_type=options['content_type'],
+            )
+            count = memory_files.import_entries(
+                entries, options['batch_size'], progress,
+            )
+        except (ValueError, SyntaxError) as exc:
+            # ParseError from the TMX parser is a SyntaxError.
+            raise CommandError(f'Cannot read {options["path"]}: {exc}')
+        finally:
+            if source is not sys.stdin.buffer:
+                source.close()
+
+        self.stdout.write(self.style.SUCCESS(f'Imported {count} entries.'))
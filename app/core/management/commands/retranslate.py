@@ -0,0 +1,259 @@
+"""
+Django command to translate stored translations again.
+"""
+import json
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core.documents import parse_document
+from core.engines import EngineError, get_engine
+from core.models import (
+    CONTENT_TYPE_CHOICES,
+    STATUS_DONE,
+    STATUS_FAILED,
+    Translation,
+    TranslationContent,
+    TranslationMemory,
+)
+from core.segments import SegmentBatch, chunk_segments
+
+# Options that select the rows; a checkpoint only resumes the same run.
+FILTER_OPTIONS = [
+    'email', 'content_type', 'target_lang', 'created_before',
+    'set_target_lang', 'reuse',
+]
+
+
+class Command(BaseCommand):
+    """Django command to re-translate translations in batches."""
+    help = (
+        'Translate stored translations again, e.g. after changing the '
+        'engine. Translations in the translation memory, content store and '
+        'segment cache are replaced, unless --reuse is given. Other '
+        'processes keep cached segments until they expire.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--email', help='Only re-translate the translations of a user.',
+        )
+        parser.add_argument(
+            '--content-type',
+            choices=[choice for choice, _ in CONTENT_TYPE_CHOICES],
+            help='Only re-translate translations of this content type.',
+        )
+        parser.add_argument(
+            '--target-lang',
+            help='Only re-translate translations into this language.',
+        )
+        parser.add_argument(
+            '--created-before',
+            help='Only re-translate translations created before this '
+                 'ISO 8601 date and time.',
+        )
+        parser.add_argument(
+            '--set-target-lang',
+            help='Translate into this language instead, and save it.',
+        )
+        parser.add_argument(
+            '--reuse', action='store_true',
+            help='Reuse stored translations instead of replacing them.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=100,
+            help='Translations translated and updated together.',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=None,
+            help='Concurrent engine requests; defaults to '
+                 'TRANSLATION_THREAD_POOL_SIZE.',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='File recording progress; an interrupted run with the '
+                 'same options resumes from it.',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Only estimate the characters and engine calls needed.',
+        )
+
+    def handle(self, *args, **options):
+        """Command Entrypoint"""
+        for name in ('target_lang', 'set_target_lang'):
+            if options[name]:
+                options[name] = options[name].upper()
+        queryset = self.get_queryset(options)
+
+        if options['dry_run']:
+            self.estimate(queryset, options)
+            return
+
+        state = self.load_checkpoint(options)
+        fresh_since = None
+        if not options['reuse']:
+            fresh_since = parse_datetime(state['started_at'])
+        total = queryset.filter(id__gt=state['last_id']).count()
+        done = 0
+        failed = []
+        started = time.perf_counter()
+        for batch in self.iter_batches(queryset, options, state['last_id']):
+            try:
+                errors = Translation.objects.retranslate(
+                    batch,
+                    workers=options['workers'],
+                    fresh_since=fresh_since,
+                )
+            except EngineError as exc:
+                raise CommandError(
+                    f'Stopped before translation {batch[0].id}: {exc} '
+                    'Run the command again to resume.'
+                )
+            failed.extend(
+                (translation.id, error)
+                for translation, error in zip(batch, errors) if error
+            )
+            state['last_id'] = batch[-1].id
+            self.save_checkpoint(options, state)
+
+            done += len(batch)
+            rate = done / (time.perf_counter() - started)
+            self.stderr.write(
+                f'Re-translated {done}/{total} translations ({rate:.1f}/s)'
+            )
+
+        for pk, error in failed:
+            self.stderr.write(f'Translation {pk}: {error}')
+        if options['checkpoint'] and os.path.exists(options['checkpoint']):
+            os.remove(options['checkpoint'])
+        if failed:
+            raise CommandError(
+                f'{len(failed)} of {done} translations could not be '
+                're-translated.'
+            )
+        self.stdout.write(
+            self.style.SUCCESS(f'Re-translated {done} translations.')
+        )
+
+    def get_queryset(self, options):
+        """Return the translations selected by the options."""
+        # Pending and running jobs are left to the translation worker.
+        queryset = Translation.objects.with_content().filter(
+            status__in=[STATUS_DONE, STATUS_FAILED],
+        ).order_by('id')
+        if options['email']:
+            queryset = queryset.filter(user__email=options['email'])
+        if options['content_type']:
+            queryset = queryset.filter(content_type=options['content_type'])
+        if options['target_lang']:
+            queryset = queryset.filter(target_lang=options['target_lang'])
+        if options['created_before']:
+            created_before = parse_datetime(options['created_before'])
+            if created_before is None:
+                raise CommandError(
+                    '--created-before must be an ISO 8601 date and time.'
+                )
+            if timezone.is_naive(created_before):
+                created_before = timezone.make_aware(created_before)
+            queryset = queryset.filter(created_at__lt=created_before)
+
+        return queryset
+
+    def iter_batches(self, queryset, options, last_id):
+        """Yield batches of translations with an id above `last_id`."""
+        while True:
+            batch = list(
+                queryset.filter(id__gt=last_id)[:options['batch_size']]
+            )
+            if not batch:
+                return
+            if options['set_target_lang']:
+                for translation in batch:
+                    translation.target_lang = options['set_target_lang']
+            yield batch
+            last_id = batch[-1].id
+
+    def load_checkpoint(self, options):
+        """Return the state of the run to resume, or of a new run."""
+        selection = {name: options[name] for name in FILTER_OPTIONS}
+        path = options['checkpoint']
+        if path and os.path.exists(path):
+            with open(path) as checkpoint:
+                state = json.load(checkpoint)
+            if state['options'] != selection:
+                raise CommandError(
+                    f'{path} was written with other options. Delete it to '
+                    'start over.'
+                )
+            self.stderr.write(
+                f'Resuming after translation {state["last_id"]}.'
+            )
+            return state
+
+        return {
+            'options': selection,
+            'started_at': timezone.now().isoformat(),
+            'last_id': 0,
+        }
+
+    def save_checkpoint(self, options, state):
+        """Write the state atomically, if a checkpoint file is used."""
+        path = options['checkpoint']
+        if not path:
+            return
+        with open(f'{path}.tmp', 'w') as checkpoint:
+            json.dump(state, checkpoint)
+        os.replace(f'{path}.tmp', path)
+
+    def estimate(self, queryset, options):
+        """Report the characters and engine calls a run would need.
+
+        Segments are counted once per batch; segments repeated across
+        batches are only translated once, so this is an upper bound.
+        """
+        engine = get_engine()
+        rows = characters = calls = 0
+        for batch in self.iter_batches(queryset, options, 0):
+            rows += len(batch)
+            if options['reuse']:
+                reused = TranslationContent.objects.reuse(batch)
+                batch = [
+                    translation for index, translation in enumerate(batch)
+                    if index not in reused
+                ]
+            groups = {}
+            for translation in batch:
+                try:
+                    document = parse_document(
+                        translation.content_type, translation.translation_input
+                    )
+                except Exception:
+                    continue
+                groups.setdefault(
+                    (translation.content_type, translation.target_lang), [],
+                ).extend(document.segments)
+
+            for (content_type, target_lang), segments in groups.items():
+                texts = SegmentBatch(
+                    segments, target_lang=target_lang,
+                    content_type=content_type,
+                ).keys
+                if options['reuse']:
+                    known = TranslationMemory.objects.lookup(texts.values())
+                    texts = {
+                        text: key for text, key in texts.items()
+                        if key not in known
+                    }
+                characters += sum(len(text) for text in texts)
+                calls += len(list(chunk_segments(
+                    list(texts), engine.max_segments, engine.max_bytes,
+                )))
+
+        self.stdout.write(
+            f'{rows} translations: at most {characters} characters in '
+            f'{calls} engine calls.'
+        )
@@ -0,0 +1,76 @@
+"""
+Django command to process pending translation jobs.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from core.models import Translation
+
+
+@contextmanager
+def heartbeat(jobs):
+    """Refresh the claim of running jobs until the block is left.
+
+    Beats three times per TRANSLATION_JOB_TIMEOUT from a thread, so jobs
+    taking longer than the timeout are not handed to another worker.
+    """
+    interval = getattr(settings, 'TRANSLATION_JOB_TIMEOUT', 600) / 3
+    ids = [job.id for job in jobs]
+    stopped = threading.Event()
+
+    def beat():
+        try:
+            while not stopped.wait(interval):
+                Translation.objects.heartbeat(ids)
+        finally:
+            # The thread has its own database connection.
+            connection.close()
+
+    thread = threading.Thread(
+        target=beat, name='translation-heartbeat', daemon=True,
+    )
+    thread.start()
+    try:
+        yield
+    finally:
+        stopped.set()
+        thread.join()
+
+
+class Command(BaseCommand):
+    """Django command to run a translation worker."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1,
+            help='Number of jobs to claim at once.',
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=1.0,
+            help='Seconds to wait when no job is pending.',
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Exit when no job is pending instead of polling.',
+        )
+
+    def handle(self, *args, **options):
+        """Command Entrypoint"""
+        self.stdout.write('Waiting for translation jobs ...')
+        while True:
+            jobs = Translation.objects.claim_pending(options['batch_size'])
+            if not jobs:
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+                continue
+
+            with heartbeat(jobs):
+                for job in jobs:
+                    job.run_job()
+                    self.stdout.write(f'Translation {job.id}: {job.status}')
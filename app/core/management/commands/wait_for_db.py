@@ -1,27 +1,60 @@
 """
 Django command to wait for db before connecting.
 """
-
+import random
 import time
 
 from psycopg2 import OperationalError as Psycopg2OpError
 
 from django.db.utils import OperationalError
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+
+from core.health import probe_database
 
 
 class Command(BaseCommand):
     """Django command to wait for db."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--timeout', type=float, default=60.0,
+            help='Seconds to wait for the database before giving up.',
+        )
+        parser.add_argument(
+            '--initial-delay', type=float, default=0.1,
+            help='Seconds to wait after the first failed attempt.',
+        )
+        parser.add_argument(
+            '--max-delay', type=float, default=5.0,
+            help='Longest wait between two attempts.',
+        )
+
+    def probe(self):
+        """Run a trivial query against the default database."""
+        probe_database('default')
+
     def handle(self, *args, **options):
         """Command Entrypoint"""
         self.stdout.write('Waiting for db ....')
-        db_up = False
-        while db_up is False:
+        deadline = time.monotonic() + options['timeout']
+        delay = options['initial_delay']
+        while True:
             try:
-                self.check(databases=['default'])
-                db_up = True
+                self.probe()
+                break
             except (Psycopg2OpError, OperationalError):
-                self.stdout.write('Database unavailable, waiting 1 second ...')
-                time.sleep(1)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise CommandError(
+                        f"Database unavailable after {options['timeout']}s."
+                    )
+                # Full jitter keeps restarting containers from probing
+                # in lockstep.
+                wait = min(random.uniform(0, delay), remaining)
+                self.stdout.write(
+                    f'Database unavailable, waiting {wait:.2f} seconds ...'
+                )
+                time.sleep(wait)
+                delay = min(delay * 2, options['max_delay'])
 
         self.stdout.write(self.style.SUCCESS('Database available!'))
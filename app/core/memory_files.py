@@ -0,0 +1,266 @@
+"""
+Bulk import and export of the translation memory.
+
+Files are read and written as streams. Imported entries are loaded in
+batches with Postgres `COPY` into a temporary table and merged into the
+translation memory with a single upsert per batch, so memory use only
+depends on the batch size.
+
+TSV files have a source and a translated text per line, escaped like
+Postgres' `COPY` text format: backslash, tab, newline, carriage return,
+backspace, form feed and vertical tab are written as `\\\\`, `\\t`,
+`\\n`, `\\r`, `\\b`, `\\f` and `\\v`.
+"""
+import csv
+import io
+import re
+import time
+from xml.etree.ElementTree import iterparse
+from xml.sax.saxutils import escape, quoteattr
+
+from django.db import connection, transaction
+
+from core.cache import get_segment_cache
+from core.models import TranslationMemory
+from core.segments import segment_key, split_whitespace
+
+FORMATS = ['tsv', 'tmx']
+XML_LANG = '{http://www.w3.org/XML/1998/namespace}lang'
+STAGING_TABLE = 'translation_memory_import'
+
+_UNESCAPE = {
+    '\\': '\\', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t',
+    'v': '\v',
+}
+
+
+def unescape_tsv(value):
+    """Return a TSV field with escape sequences replaced."""
+    return re.sub(
+        r'\\(.)', lambda match: _UNESCAPE.get(match[1], match[1]), value,
+    )
+
+
+def read_tsv(lines):
+    """Yield (source text, translated text) pairs from TSV lines."""
+    for number, line in enumerate(lines, start=1):
+        line = line.rstrip('\r\n')
+        if not line:
+            continue
+        fields = line.split('\t')
+        if len(fields) != 2:
+            raise ValueError(
+                f'Line {number}: expected 2 tab-separated fields, '
+                f'got {len(fields)}.'
+            )
+        yield unescape_tsv(fields[0]), unescape_tsv(fields[1])
+
+
+def _matches(lang, wanted):
+    """Return whether a TMX language code is, or is a variant of, wanted."""
+    lang = lang.upper().replace('_', '-')
+    wanted = wanted.upper().replace('_', '-')
+    return lang == wanted or lang.startswith(wanted + '-')
+
+
+def read_tmx(source, *, source_lang, target_lang):
+    """Yield (source text, translated text) pairs from a TMX file.
+
+    The file is parsed incrementally and every translation unit is
+    discarded once read. Units without a variant in both languages are
+    skipped; inline markup is dropped from segments.
+    """
+    events = iterparse(source, events=('start', 'end'))
+    _, root = next(events)
+    for event, element in events:
+        if event != 'end' or element.tag != 'tu':
+            continue
+        texts = {}
+        for variant in element.iter('tuv'):
+            lang = variant.get(XML_LANG) or variant.get('lang', '')
+            segment = variant.find('seg')
+            if segment is None:
+                continue
+            for side, wanted in (('source', source_lang),
+                                 ('target', target_lang)):
+                if side not in texts and _matches(lang, wanted):
+                    texts[side] = ''.join(segment.itertext())
+        if len(texts) == 2:
+            yield texts['source'], texts['target']
+        root.clear()
+
+
+def read_pairs(source, file_format, *, source_lang, target_lang):
+    """Yield (source text, translated text) pairs from a binary file."""
+    if file_format == 'tmx':
+        return read_tmx(
+            source, source_lang=source_lang, target_lang=target_lang,
+        )
+
+    return read_tsv(io.TextIOWrapper(source, encoding='utf-8'))
+
+
+def iter_entries(pairs, *, target_lang, content_type):
+    """Yield translation memory rows for (source, translation) pairs.
+
+    Texts are trimmed and keyed like the segments `SegmentBatch` looks
+    up. The engine detects the source language, so entries are keyed
+    without one.
+    """
+    for source_text, target_text in pairs:
+        source_text = split_whitespace(source_text)[1]
+        target_text = split_whitespace(target_text)[1]
+        if not source_text or not target_text:
+            continue
+        yield (
+            segment_key(source_text, target_lang, content_type),
+            '',
+            target_lang,
+            content_type,
+            source_text,
+            target_text,
+        )
+
+
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def import_entries(entries, batch_size=50000, progress=None):
+    """Upsert translation memory rows, returning how many were read.
+
+    Every batch is copied into a temporary table and merged in its own
+    transaction; entries with a known key replace the stored
+    translation and are dropped from the segment cache. Other processes
+    may serve the old translation from their in-process cache until it
+    expires. `progress` is called with the running count after every
+    batch.
+    """
+    table = connection.ops.quote_name(TranslationMemory._meta.db_table)
+    columns = (
+        'key, source_lang, target_lang, content_type, '
+        'source_text, target_text'
+    )
+    count = 0
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE TEMPORARY TABLE IF NOT EXISTS {STAGING_TABLE} '
+            f'AS SELECT {columns} FROM {table} WITH NO DATA'
+        )
+        for batch in _batches(entries, batch_size):
+            # ON CONFLICT must not see a key twice; the last entry wins.
+            unique = {row[0]: row for row in batch}.values()
+            buffer = io.StringIO()
+            # Quoted, so empty strings are not read as NULL.
+            csv.writer(buffer, quoting=csv.QUOTE_ALL).writerows(unique)
+            buffer.seek(0)
+            with transaction.atomic():
+                cursor.execute(f'TRUNCATE {STAGING_TABLE}')
+                cursor.copy_expert(
+                    f'COPY {STAGING_TABLE} ({columns}) '
+                    f'FROM STDIN WITH (FORMAT csv)',
+                    buffer,
+                )
+                cursor.execute(
+                    f'INSERT INTO {table} ({columns}, created_at) '
+                    f'SELECT {columns}, now() '
+                    f'FROM {STAGING_TABLE} '
+                    f'ON CONFLICT (key) DO UPDATE SET '
+                    f'source_text = EXCLUDED.source_text, '
+                    f'target_text = EXCLUDED.target_text'
+                )
+            get_segment_cache().delete_many(row[0] for row in unique)
+            count += len(batch)
+            if progress is not None:
+                progress(count)
+
+    return count
+
+
+def export_tsv(output, *, target_lang, content_type):
+    """Write the matching entries to a binary file with `COPY ... TO`.
+
+    Returns the number of entries written.
+    """
+    table = connection.ops.quote_name(TranslationMemory._meta.db_table)
+    with connection.cursor() as cursor:
+        query = cursor.mogrify(
+            f'SELECT source_text, target_text FROM {table} '
+            f'WHERE target_lang = %s AND content_type = %s',
+            [target_lang, content_type],
+        ).decode()
+        cursor.copy_expert(f'COPY ({query}) TO STDOUT', output)
+
+        return cursor.rowcount
+
+
+def iter_tmx(rows, *, source_lang, target_lang):
+    """Yield a TMX document for (source text, translation) rows."""
+    source_lang = source_lang or 'und'
+    yield (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<tmx version="1.4">\n'
+        '<header creationtool="translation-api" creationtoolversion="1" '
+        'datatype="plaintext" segtype="sentence" adminlang="en" '
+        f'srclang={quoteattr(source_lang)} o-tmf="tsv"/>\n'
+        '<body>\n'
+    )
+    for source_text, target_text in rows:
+        yield (
+            '<tu>'
+            f'<tuv xml:lang={quoteattr(source_lang)}>'
+            f'<seg>{escape(source_text)}</seg></tuv>'
+            f'<tuv xml:lang={quoteattr(target_lang)}>'
+            f'<seg>{escape(target_text)}</seg></tuv>'
+            '</tu>\n'
+        )
+    yield '</body>\n</tmx>\n'
+
+
+def export_tmx(output, *, source_lang, target_lang, content_type,
+               chunk_size=2000):
+    """Write the matching entries to a binary file as TMX.
+
+    Rows are read with a server-side cursor. Returns the number of
+    entries written.
+    """
+    rows = TranslationMemory.objects.filter(
+        target_lang=target_lang, content_type=content_type,
+    ).values_list('source_text', 'target_text').iterator(
+        chunk_size=chunk_size
+    )
+    count = 0
+
+    def counted(rows):
+        nonlocal count
+        for row in rows:
+            count += 1
+            yield row
+
+    for part in iter_tmx(
+        counted(rows), source_lang=source_lang, target_lang=target_lang,
+    ):
+        output.write(part.encode())
+
+    return count
+
+
+class Progress:
+    """Report a running count and rate to a stream."""
+
+    def __init__(self, stream, label):
+        self.stream = stream
+        self.label = label
+        self.started = time.perf_counter()
+
+    def __call__(self, count):
+        elapsed = time.perf_counter() - self.started
+        rate = count / elapsed if elapsed else 0
+        self.stream.write(f'{self.label} {count} entries ({rate:.0f}/s)')
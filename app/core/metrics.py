@@ -0,0 +1,143 @@
+"""
+Prometheus metrics.
+
+Metrics are kept per process. When PROMETHEUS_MULTIPROC_DIR is set,
+prometheus_client writes them to files in that directory instead, and
+the metrics view aggregates the files of all worker processes.
+"""
+import os
+import time
+from contextlib import contextmanager
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds',
+    'Time to the response of a request.',
+    ['method', 'route', 'status'],
+)
+REQUEST_DB_TIME = Histogram(
+    'http_request_db_duration_seconds',
+    'Time spent in database queries per request.',
+    ['route'],
+)
+ENGINE_CALLS = Counter(
+    'translation_engine_calls_total',
+    'Requests sent to the translation engine.',
+    ['engine', 'target_lang'],
+)
+ENGINE_CHARACTERS = Counter(
+    'translation_engine_characters_total',
+    'Characters sent to the translation engine.',
+    ['engine', 'target_lang'],
+)
+ENGINE_ERRORS = Counter(
+    'translation_engine_errors_total',
+    'Failed requests to the translation engine.',
+    ['engine', 'target_lang'],
+)
+ENGINE_LATENCY = Histogram(
+    'translation_engine_duration_seconds',
+    'Duration of requests to the translation engine.',
+    ['engine'],
+)
+DOCUMENT_SEGMENTS = Histogram(
+    'translation_document_segments',
+    'Translatable segments per document.',
+    ['content_type'],
+    buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000),
+)
+SEGMENTS = Counter(
+    'translation_segments_total',
+    'Unique segments looked up, by where the translation came from.',
+    ['source'],
+)
+
+SEGMENT_CACHE_EVENTS = Counter(
+    'translation_segment_cache_events_total',
+    'Segment cache lookups and evictions: hits, misses, evictions, '
+    'expirations, shared_hits and shared_misses.',
+    ['event'],
+)
+SEGMENT_CACHE_ENTRIES = Gauge(
+    'translation_segment_cache_entries',
+    'Entries in the in-process segment cache.',
+    multiprocess_mode='livesum',
+)
+SEGMENT_CACHE_BYTES = Gauge(
+    'translation_segment_cache_bytes',
+    'Estimated size of the in-process segment cache.',
+    multiprocess_mode='livesum',
+)
+
+
+def observe_request(request, response, duration, db_duration=None):
+    """Record the latency of a request."""
+    match = request.resolver_match
+    route = match.view_name if match else 'unmatched'
+    REQUEST_LATENCY.labels(
+        request.method, route, str(response.status_code)
+    ).observe(duration)
+    if db_duration is not None:
+        REQUEST_DB_TIME.labels(route).observe(db_duration)
+
+
+@contextmanager
+def observe_engine_call(engine, texts, target_lang):
+    """Count and time a request to the engine."""
+    name = type(engine).__name__
+    ENGINE_CALLS.labels(name, target_lang).inc()
+    ENGINE_CHARACTERS.labels(name, target_lang).inc(
+        sum(len(text) for text in texts)
+    )
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        ENGINE_ERRORS.labels(name, target_lang).inc()
+        raise
+    finally:
+        ENGINE_LATENCY.labels(name).observe(time.perf_counter() - start)
+
+
+def observe_document(content_type, segments):
+    """Record the number of segments of a document to translate."""
+    DOCUMENT_SEGMENTS.labels(content_type).observe(segments)
+
+
+def observe_segments(cached=0, remembered=0, missing=0):
+    """Count segments served by the cache, the memory and the engine."""
+    for source, count in (
+        ('cache', cached), ('memory', remembered), ('engine', missing),
+    ):
+        if count:
+            SEGMENTS.labels(source).inc(count)
+
+
+def observe_segment_cache(events, entries, size):
+    """Count segment cache events and record the size of the cache."""
+    for event, count in events.items():
+        if count:
+            SEGMENT_CACHE_EVENTS.labels(event).inc(count)
+    SEGMENT_CACHE_ENTRIES.set(entries)
+    SEGMENT_CACHE_BYTES.set(size)
+
+
+def render_metrics():
+    """Return the metrics of this process, or of all processes."""
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,78 @@
+"""
+Middleware for the project.
+"""
+import asyncio
+import time
+
+from asgiref.sync import sync_to_async
+
+from django.db import connection
+from django.utils.decorators import sync_and_async_middleware
+
+from core import profiling
+from core.metrics import observe_request
+
+
+class QueryTimer:
+    """Database execute wrapper adding up the time spent in queries."""
+
+    def __init__(self):
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+
+
+@sync_and_async_middleware
+def metrics_middleware(get_response):
+    """Record the latency of every request.
+
+    On the sync path the time spent in database queries is recorded too;
+    async views run their queries on other threads' connections.
+    """
+    if asyncio.iscoroutinefunction(get_response):
+        async def middleware(request):
+            start = time.perf_counter()
+            response = await get_response(request)
+            observe_request(request, response, time.perf_counter() - start)
+            return response
+    else:
+        def middleware(request):
+            start = time.perf_counter()
+            timer = QueryTimer()
+            with connection.execute_wrapper(timer):
+                response = get_response(request)
+            observe_request(
+                request, response, time.perf_counter() - start,
+                db_duration=timer.duration,
+            )
+            return response
+
+    return middleware
+
+
+@sync_and_async_middleware
+def profiling_middleware(get_response):
+    """Profile requests that ask for it with an X-Profile header."""
+    if asyncio.iscoroutinefunction(get_response):
+        async def middleware(request):
+            if not profiling.is_requested(request):
+                return await get_response(request)
+            with profiling.RequestProfiler(request) as profiler:
+                response = await get_response(request)
+            # Checking the user may query the session.
+            return await sync_to_async(profiler.finish)(request, response)
+    else:
+        def middleware(request):
+            if not profiling.is_requested(request):
+                return get_response(request)
+            with profiling.RequestProfiler(request) as profiler, \
+                    connection.execute_wrapper(profiling.time_query):
+                response = get_response(request)
+            return profiler.finish(request, response)
+
+    return middleware
@@ -0,0 +1,33 @@
+# Generated by Django 3.2.25 on 2026-10-18 02:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TranslationMemory',
+            fields=[
+                ('key', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('source_lang', models.CharField(blank=True, max_length=10)),
+                ('target_lang', models.CharField(max_length=10)),
+                ('content_type', models.CharField(choices=[('plain_text', 'Plain Text'), ('html', 'HTML')], max_length=100)),
+                ('source_text', models.TextField()),
+                ('target_text', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name_plural': 'translation memory',
+            },
+        ),
+        migrations.AlterField(
+            model_name='translation',
+            name='content_type',
+            field=models.CharField(choices=[('plain_text', 'Plain Text'), ('html', 'HTML')], max_length=100),
+        ),
+    ]
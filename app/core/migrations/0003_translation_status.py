@@ -0,0 +1,23 @@
+# Generated by Django 3.2.25 on 2026-10-18 02:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_translationmemory'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='translation',
+            name='error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='translation',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='done', max_length=20),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 3.2.25 on 2026-10-18 02:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_translation_status'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='translation',
+            index=models.Index(fields=['user', '-id'], name='translation_user_id_desc'),
+        ),
+        migrations.AddIndex(
+            model_name='translation',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['id'], name='translation_pending'),
+        ),
+    ]
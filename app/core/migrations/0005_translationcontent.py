@@ -0,0 +1,30 @@
+# Generated by Django 3.2.25 on 2026-10-18 02:32
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_translation_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TranslationContent',
+            fields=[
+                ('key', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('target_lang', models.CharField(max_length=10)),
+                ('content_type', models.CharField(choices=[('plain_text', 'Plain Text'), ('html', 'HTML')], max_length=100)),
+                ('translation_input', models.TextField()),
+                ('translation_result', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='translation',
+            name='content',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='translations', to='core.translationcontent'),
+        ),
+    ]
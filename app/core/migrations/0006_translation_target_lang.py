@@ -0,0 +1,18 @@
+# Generated by Django 3.2.25 on 2026-10-18 02:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_translationcontent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='translation',
+            name='target_lang',
+            field=models.CharField(default='DE', max_length=10),
+        ),
+    ]
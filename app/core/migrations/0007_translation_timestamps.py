@@ -0,0 +1,25 @@
+# Generated by Django 3.2.25 on 2026-10-18 02:48
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_translation_target_lang'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='translation',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='translation',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
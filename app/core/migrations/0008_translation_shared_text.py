@@ -0,0 +1,117 @@
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.db.models.deletion
+
+from core.segments import document_key
+
+BATCH_SIZE = 1000
+
+
+def share_text(apps, schema_editor):
+    """Move the text of translated rows into the content store."""
+    if not getattr(settings, 'TRANSLATION_CONTENT_STORE', True):
+        return
+    Translation = apps.get_model('core', 'Translation')
+    TranslationContent = apps.get_model('core', 'TranslationContent')
+    rows = Translation.objects.filter(status='done').exclude(
+        input_text='',
+    ).order_by('id').only(
+        'id', 'content_type', 'target_lang', 'input_text', 'result_text',
+    )
+
+    last_id = 0
+    while True:
+        batch = list(rows.filter(id__gt=last_id)[:BATCH_SIZE])
+        if not batch:
+            break
+        last_id = batch[-1].id
+        keys = {
+            row.id: document_key(
+                row.input_text, row.target_lang, row.content_type,
+            )
+            for row in batch
+        }
+        TranslationContent.objects.bulk_create(
+            [
+                TranslationContent(
+                    key=keys[row.id],
+                    target_lang=row.target_lang,
+                    content_type=row.content_type,
+                    translation_input=row.input_text,
+                    translation_result=row.result_text,
+                )
+                for row in batch
+            ],
+            ignore_conflicts=True,
+        )
+        stored = dict(
+            TranslationContent.objects.filter(
+                key__in=keys.values(),
+            ).values_list('key', 'translation_result')
+        )
+        # Rows whose result differs from the stored one keep their text.
+        shared = [
+            row for row in batch if stored[keys[row.id]] == row.result_text
+        ]
+        for row in shared:
+            row.content_id = keys[row.id]
+            row.input_text = ''
+            row.result_text = ''
+        Translation.objects.bulk_update(
+            shared, ['content', 'input_text', 'result_text'],
+        )
+
+
+def restore_text(apps, schema_editor):
+    """Copy the text from the content store back into the rows."""
+    Translation = apps.get_model('core', 'Translation')
+    TranslationContent = apps.get_model('core', 'TranslationContent')
+    content = TranslationContent.objects.filter(key=OuterRef('content_id'))
+    Translation.objects.filter(
+        content__isnull=False, input_text='',
+    ).update(
+        input_text=Subquery(content.values('translation_input')[:1]),
+        result_text=Subquery(content.values('translation_result')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_translation_timestamps'),
+    ]
+
+    operations = [
+        # The columns keep their names; only the model fields change.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.RenameField(
+                    model_name='translation',
+                    old_name='translation_input',
+                    new_name='input_text',
+                ),
+                migrations.AlterField(
+                    model_name='translation',
+                    name='input_text',
+                    field=models.TextField(blank=True, db_column='translation_input'),
+                ),
+                migrations.RenameField(
+                    model_name='translation',
+                    old_name='translation_result',
+                    new_name='result_text',
+                ),
+                migrations.AlterField(
+                    model_name='translation',
+                    name='result_text',
+                    field=models.TextField(blank=True, db_column='translation_result'),
+                ),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='translation',
+            name='content',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='translations', to='core.translationcontent'),
+        ),
+        migrations.RunPython(share_text, restore_text),
+    ]
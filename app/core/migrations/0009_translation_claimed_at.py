@@ -0,0 +1,22 @@
+# Generated by Django 3.2.25 on 2026-10-18 03:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_translation_shared_text'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='translation',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='translation',
+            index=models.Index(condition=models.Q(('status', 'running')), fields=['claimed_at'], name='translation_running'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+from django.db import migrations
+
+
+def prune_content(apps, schema_editor):
+    """Delete stored documents no translation refers to."""
+    TranslationContent = apps.get_model('core', 'TranslationContent')
+    TranslationContent.objects.filter(translations__isnull=True).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_translation_claimed_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(prune_content, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,14 @@
 """
 Database Models.
 """
+from datetime import timedelta
+
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Value
+from django.db.models.functions import Coalesce, NullIf
+from django.db.models.signals import post_delete
+from django.utils import timezone
 from django.contrib.postgres.fields import ArrayField
 from django.utils.translation import gettext_lazy as _
 
@@ -14,20 +20,23 @@ from django.contrib.auth.models import (
     Permission,
     )
 
-from bs4 import BeautifulSoup, NavigableString
-
-import json
+from bs4 import BeautifulSoup
 
-from deepl import Translator
-# from app.config import DEEPL_AUTH_KEY
-import os
-# Get the value of DEEPL_AUTH_KEY from the environment variable
-DEEPL_AUTH_KEY = os.environ.get('DEEPL_AUTH_KEY')
+from asgiref.sync import sync_to_async
 
-# If DEEPL_AUTH_KEY is empty, fallback to the value from app/config.py
-if not DEEPL_AUTH_KEY:
-    from app import config
-    DEEPL_AUTH_KEY = config.DEEPL_AUTH_KEY
+from core.documents import parse_document, parse_html
+from core.engines import get_engine
+from core.metrics import observe_document
+from core.renderers import dumps
+from core.segments import (
+    atranslate_segments,
+    chunk_segments,
+    document_key,
+    translate_segments,
+    translate_segment_groups,
+    translate_segments_multi,
+    unique_segments,
+)
 
 
 class UserManager(BaseUserManager):
@@ -86,102 +95,871 @@ CONTENT_TYPE_CHOICES = [
     ('html', 'HTML'),
 ]
 
-translator = Translator(DEEPL_AUTH_KEY)
+STATUS_PENDING = 'pending'
+STATUS_RUNNING = 'running'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+
+STATUS_CHOICES = [
+    (STATUS_PENDING, 'Pending'),
+    (STATUS_RUNNING, 'Running'),
+    (STATUS_DONE, 'Done'),
+    (STATUS_FAILED, 'Failed'),
+]
+
+
+# Text properties of translations, and the columns holding them for
+# rows whose text is not in the content store.
+TEXT_FIELDS = {
+    'translation_input': 'input_text',
+    'translation_result': 'result_text',
+}
+
+
+class TranslationQuerySet(models.QuerySet):
+    """Queries for translations."""
+
+    def with_content(self, *fields):
+        """Load the text from the content store along with the rows.
+
+        With `fields`, only those fields are loaded, like `only()`; the
+        text properties may be among them.
+        """
+        if not fields:
+            return self.select_related('content')
+        if not TEXT_FIELDS.keys() & set(fields):
+            return self.only(*fields)
+        columns = ['content']
+        for name in fields:
+            if name in TEXT_FIELDS:
+                columns += [TEXT_FIELDS[name], f'content__{name}']
+            else:
+                columns.append(name)
+
+        return self.select_related('content').only(*columns)
+
+    def with_text(self):
+        """Annotate the text properties, for use with `values()`."""
+        return self.annotate(**{
+            name: Coalesce(
+                NullIf(column, Value('')),
+                f'content__{name}',
+                Value(''),
+                output_field=models.TextField(),
+            )
+            for name, column in TEXT_FIELDS.items()
+        })
+
+
+class TranslationManager(models.Manager.from_queryset(TranslationQuerySet)):
+    """Manager for translations."""
+
+    def claim_pending(self, limit=1):
+        """Mark up to `limit` pending translations as running.
+
+        Rows locked by other workers are skipped, so several workers can
+        claim jobs concurrently without handing out a job twice. Running
+        jobs without a heartbeat for TRANSLATION_JOB_TIMEOUT seconds, as
+        their worker died, are queued again first.
+        """
+        now = timezone.now()
+        timeout = getattr(settings, 'TRANSLATION_JOB_TIMEOUT', 600)
+        with transaction.atomic():
+            self.filter(
+                models.Q(claimed_at__lt=now - timedelta(seconds=timeout)) |
+                models.Q(claimed_at__isnull=True),
+                status=STATUS_RUNNING,
+            ).update(status=STATUS_PENDING)
+            ids = list(
+                self.select_for_update(skip_locked=True)
+                .filter(status=STATUS_PENDING)
+                .order_by('id')
+                .values_list('id', flat=True)[:limit]
+            )
+            self.filter(id__in=ids).update(
+                status=STATUS_RUNNING, claimed_at=now, updated_at=now,
+            )
+
+        return list(self.filter(id__in=ids).order_by('id'))
+
+    def heartbeat(self, ids):
+        """Record that the workers of running jobs are still alive."""
+        self.filter(id__in=ids, status=STATUS_RUNNING).update(
+            claimed_at=timezone.now(),
+        )
+
+    def bulk_translate(self, translations):
+        """Translate and save several unsaved translations at once.
+
+        Segments are collected from all documents and de-duplicated
+        across the batch before they are translated, and the rows are
+        inserted with a single bulk INSERT. If translating them together
+        fails, every document is translated on its own, so only the
+        failing ones are not saved. Returns a list with the error
+        message for every translation, or None if it was saved.
+        """
+        errors = [None] * len(translations)
+        reused = TranslationContent.objects.reuse(translations)
+        documents = {}
+        for index, translation in enumerate(translations):
+            if index in reused:
+                continue
+            try:
+                documents[index] = parse_document(
+                    translation.content_type, translation.translation_input
+                )
+                observe_document(
+                    translation.content_type, len(documents[index].segments)
+                )
+            except Exception as exc:
+                errors[index] = str(exc)
+
+        groups = {}
+        for index, document in documents.items():
+            groups.setdefault(
+                (
+                    translations[index].content_type,
+                    translations[index].target_lang,
+                ),
+                [],
+            ).append(index)
+
+        pending = list(groups.values())
+        while pending:
+            indexes = pending.pop()
+            segments = list(dict.fromkeys(
+                segment
+                for index in indexes
+                for segment in documents[index].segments
+            ))
+            try:
+                translated = dict(zip(
+                    segments,
+                    translations[indexes[0]].translate_text(segments),
+                ))
+            except Exception as exc:
+                if len(indexes) > 1:
+                    # The failure may come from a single document, so
+                    # the documents are retried one by one.
+                    pending.extend([index] for index in indexes)
+                else:
+                    errors[indexes[0]] = str(exc)
+                continue
+
+            for index in indexes:
+                document = documents[index]
+                translations[index].translation_result = document.render(
+                    [translated[segment] for segment in document.segments]
+                )
+                translations[index].status = STATUS_DONE
+
+        with transaction.atomic():
+            TranslationContent.objects.store([
+                translations[index]
+                for index in documents if errors[index] is None
+            ])
+            created = [
+                translation
+                for translation, error in zip(translations, errors)
+                if error is None
+            ]
+            for translation in created:
+                translation.share_content_text()
+            self.bulk_create(created)
+
+        return errors
+
+    def retranslate(self, translations, *, workers=None, fresh_since=None):
+        """Translate saved translations again and update their rows.
+
+        Segments are de-duplicated across all documents, and the engine
+        requests of all content types and languages share a pool of
+        `workers` threads. With `fresh_since`, stored translations older
+        than that are replaced instead of reused, and so are the results
+        of other rows sharing their documents. Rows whose input was
+        edited in the meantime are left alone. Returns a list with the
+        error message for every translation, or None if it was updated.
+        """
+        errors = [None] * len(translations)
+        reused = TranslationContent.objects.reuse(
+            translations, since=fresh_since,
+        )
+        documents = {}
+        for index, translation in enumerate(translations):
+            if index in reused:
+                continue
+            try:
+                documents[index] = parse_document(
+                    translation.content_type, translation.translation_input
+                )
+                observe_document(
+                    translation.content_type, len(documents[index].segments)
+                )
+            except Exception as exc:
+                errors[index] = str(exc)
+
+        groups = {}
+        for index, document in documents.items():
+            translation = translations[index]
+            groups.setdefault(
+                (translation.content_type, translation.target_lang), {},
+            ).update(dict.fromkeys(document.segments))
+        results = translate_segment_groups(
+            {group: list(segments) for group, segments in groups.items()},
+            get_engine(),
+            workers=workers,
+            fresh_since=fresh_since,
+        )
+        translated = {
+            group: dict(zip(groups[group], result))
+            for group, result in results.items()
+        }
+        for index, document in documents.items():
+            translation = translations[index]
+            segments = translated[
+                translation.content_type, translation.target_lang
+            ]
+            translation.translation_result = document.render(
+                [segments[segment] for segment in document.segments]
+            )
+
+        now = timezone.now()
+        with transaction.atomic():
+            current = {
+                row[0]: row[1:]
+                for row in self.select_for_update().filter(
+                    id__in=[translation.id for translation in translations]
+                ).values_list(
+                    'id', 'content_type', 'input_text', 'content_id',
+                )
+            }
+            for index, translation in enumerate(translations):
+                saved = translation._saved
+                if errors[index] is None and current.get(translation.id) != (
+                    saved['content_type'],
+                    saved['input_text'],
+                    saved['content_id'],
+                ):
+                    errors[index] = 'The input changed while translating.'
+            updated = [
+                translation
+                for translation, error in zip(translations, errors)
+                if error is None
+            ]
+            for translation in updated:
+                translation.status = STATUS_DONE
+                translation.error = ''
+                translation.updated_at = now
+            stored = [
+                translations[index]
+                for index in documents if errors[index] is None
+            ]
+            TranslationContent.objects.store(
+                stored, replace=fresh_since is not None,
+            )
+            if fresh_since is not None:
+                # Rows of other users may share a replaced document; they
+                # show its new result too, so their validators change.
+                self.filter(content__in={
+                    translation.content_id for translation in stored
+                }).update(updated_at=now)
+            for translation in updated:
+                translation.share_content_text()
+            self.bulk_update(updated, [
+                'input_text', 'result_text', 'target_lang', 'status',
+                'error', 'content', 'updated_at',
+            ])
+            TranslationContent.objects.prune(
+                current[translation.id][2] for translation in updated
+                if current[translation.id][2] != translation.content_id
+            )
+
+        return errors
+
+    def create_for_languages(self, *, target_langs, **fields):
+        """Translate one input into several languages.
+
+        The input is parsed once, and the engine requests for all
+        languages are issued concurrently. A translation is saved per
+        language, and the translations are returned in the order of
+        `target_langs`.
+        """
+        translations = [
+            self.model(target_lang=target_lang, **fields)
+            for target_lang in dict.fromkeys(target_langs)
+        ]
+        reused = TranslationContent.objects.reuse(translations)
+        missing = [
+            translation for index, translation in enumerate(translations)
+            if index not in reused
+        ]
+        if missing:
+            document = parse_document(
+                missing[0].content_type, missing[0].translation_input
+            )
+            observe_document(missing[0].content_type, len(document.segments))
+            results = translate_segments_multi(
+                document.segments,
+                get_engine(),
+                target_langs=[
+                    translation.target_lang for translation in missing
+                ],
+                content_type=missing[0].content_type,
+            )
+            for translation in missing:
+                translation.translation_result = document.render(
+                    results[translation.target_lang]
+                )
+                translation.status = STATUS_DONE
+
+        with transaction.atomic():
+            TranslationContent.objects.store(missing)
+            for translation in translations:
+                translation.share_content_text()
+            self.bulk_create(translations)
+
+        return translations
 
 
 class Translation(models.Model):
-    """Model for translations request & response."""
+    """Model for translations request & response.
+
+    The input and result are read and written through the
+    `translation_input` and `translation_result` properties. Once the
+    text is in the content store, the row references it there and its
+    own text columns are left blank.
+    """
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
     content_type = \
         models.CharField(max_length=100, choices=CONTENT_TYPE_CHOICES)
-    translation_input = models.TextField(blank=True)
+    input_text = models.TextField(blank=True, db_column='translation_input')
     translation_elements = ArrayField(
         models.CharField(max_length=255),
         blank=True,
         default=list,
         )
-    translation_result = models.TextField(blank=True)
-
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self._translator = None
+    result_text = \
+        models.TextField(blank=True, db_column='translation_result')
+    target_lang = models.CharField(max_length=10, default='DE')
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default=STATUS_DONE,
+    )
+    error = models.TextField(blank=True)
+    content = models.ForeignKey(
+        'TranslationContent',
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='translations',
+    )
+    # Last heartbeat of the worker translating a running job.
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = TranslationManager()
+
+    class Meta:
+        indexes = [
+            # Listing a user's translations, newest first.
+            models.Index(
+                fields=['user', '-id'], name='translation_user_id_desc',
+            ),
+            # Claiming pending jobs in the translation worker.
+            models.Index(
+                fields=['id'],
+                name='translation_pending',
+                condition=models.Q(status=STATUS_PENDING),
+            ),
+            # Finding running jobs whose worker died.
+            models.Index(
+                fields=['claimed_at'],
+                name='translation_running',
+                condition=models.Q(status=STATUS_RUNNING),
+            ),
+        ]
 
     def __str__(self):
         return f"Translation {self.id} Input: {self.translation_input}"
 
+    @property
+    def translation_input(self):
+        if self.content_id is not None and not self.input_text:
+            return self.content.translation_input
+        return self.input_text
+
+    @translation_input.setter
+    def translation_input(self, value):
+        if value != self.translation_input:
+            self._detach_content()
+            self.input_text = value
+
+    @property
+    def translation_result(self):
+        if self.content_id is not None and not self.result_text:
+            return self.content.translation_result
+        return self.result_text
+
+    @translation_result.setter
+    def translation_result(self, value):
+        if value != self.translation_result:
+            self._detach_content()
+            self.result_text = value
+
+    def _detach_content(self):
+        """Copy the text out of the content store and drop the reference."""
+        if self.content_id is not None:
+            self.input_text = self.translation_input
+            self.result_text = self.translation_result
+            self.content = None
+
+    def share_content_text(self):
+        """Blank the text columns if the content store holds the text.
+
+        Only done when the referenced content is loaded and matches, so
+        the text is never lost.
+        """
+        if self.content_id is None or \
+                not Translation.content.is_cached(self):
+            return
+        content = self.content
+        if self.input_text in ('', content.translation_input) and \
+                self.result_text in ('', content.translation_result):
+            self.input_text = ''
+            self.result_text = ''
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember_saved_input()
+        return instance
+
+    def _remember_saved_input(self):
+        """Keep the saved input and result to detect and diff changes.
+
+        The text columns are kept as saved; text in the content store
+        is only loaded when `get_previous_translations` needs it.
+        """
+        deferred = self.get_deferred_fields()
+        self._saved = {
+            name: getattr(self, name)
+            for name in (
+                'content_type', 'target_lang', 'input_text', 'result_text',
+                'content_id',
+            )
+            if name not in deferred
+        }
+
+    def input_changed(self):
+        """Return whether the input differs from the saved input."""
+        saved = getattr(self, '_saved', {})
+        fields = ('content_type', 'target_lang', 'input_text', 'content_id')
+        if self.pk is None or not saved.keys() >= set(fields):
+            return True
+
+        return any(saved[name] != getattr(self, name) for name in fields)
+
+    def get_saved_text(self):
+        """Return the input and result as last saved, or None."""
+        saved = getattr(self, '_saved', {})
+        if not saved.keys() >= {'input_text', 'result_text', 'content_id'}:
+            return None
+        if saved['content_id'] is None or saved['input_text']:
+            return saved['input_text'], saved['result_text']
+
+        return TranslationContent.objects.filter(
+            key=saved['content_id'],
+        ).values_list('translation_input', 'translation_result').first()
+
+    def get_previous_translations(self):
+        """Return a mapping of saved segments to their saved translation.
+
+        Empty unless the saved input and result split into the same
+        number of segments, so they can be paired up.
+        """
+        saved = getattr(self, '_saved', {})
+        if saved.get('content_type') != self.content_type or \
+                saved.get('target_lang') != self.target_lang:
+            return {}
+        saved_input, saved_result = self.get_saved_text() or ('', '')
+        if not saved_input or not saved_result:
+            return {}
+
+        source = parse_document(self.content_type, saved_input)
+        target = parse_document(self.content_type, saved_result)
+        if type(source) is not type(target) or \
+                len(source.segments) != len(target.segments):
+            return {}
+
+        previous = {}
+        for segment, translation in zip(source.segments, target.segments):
+            previous.setdefault(segment, translation)
+
+        return previous
+
     def translate_input(self):
+        if TranslationContent.objects.reuse([self]):
+            return self.translation_result
         if self.content_type == 'plain_text':
             # Translate the input directly if it's a plain text.
-            self.translation_result = self.translate_to_german(self.translation_input)
+            observe_document(self.content_type, 1)
+            self.translation_result = self.translate_text(
+                self.translation_input
+            )
         elif self.translation_input:
             # Otherwise, process the input as HTML.
-            soup = self.translate_html()
-            self.translation_result = str(soup)
-            # print(soup)
-            return self.translation_result
-
-    def translate_html(self, tags=None):
-        """Translate HTML tags."""
-        soup = BeautifulSoup(self.translation_input, 'html.parser')
-        for tag in soup.descendants:
-            if tag == None:
-                continue
-            # fix: this causes only the first NavigableString to be translated
-            if tag.parent.string == None:
-                continue
-            if isinstance(tag, NavigableString):
-                translated_text = self.translate_to_german(str(tag))
-                # print(tag.parent.string)
-                tag.parent.string.replace_with(str(translated_text))
-
-        return soup
-
-        # if tags is None:
-        #     tags = soup.find_all(True)  # Find all tags
-        # for tag in tags:
-        #     if isinstance(tag, NavigableString):
-        #         # Translate the NavigableString object
-        #         translated_text = self.translate_to_german(str(tag))
-        #         # print(tag.parent)
-        #         # if tag.parent.string.has_attr('replace_with'):
-        #         tag.parent.string.replace_with(str(translated_text))
-        #     elif tag.contents:
-        #         # print(tag.contents)
-        #         # If the tag has children, handle them recursively
-        #         self.translate_html(tag.contents)
-
-        self.translation_result = str(soup)
-
+            self.translation_result = self.translate_html(
+                previous=self.get_previous_translations(),
+            )
+        TranslationContent.objects.store([self])
         return self.translation_result
 
+    async def atranslate_input(self):
+        """Translate the input without blocking the event loop."""
+        reused = await sync_to_async(TranslationContent.objects.reuse)([self])
+        if not reused:
+            document = parse_document(
+                self.content_type, self.translation_input
+            )
+            observe_document(self.content_type, len(document.segments))
+            translations = await atranslate_segments(
+                document.segments,
+                get_engine(),
+                target_lang=self.target_lang,
+                content_type=self.content_type,
+            )
+            self.translation_result = document.render(translations)
+            await sync_to_async(TranslationContent.objects.store)([self])
+        self.status = STATUS_DONE
+        self.error = ''
+
+    def iter_translate_input(self):
+        """Translate the input batch by batch.
+
+        Yields a list of (segment index, translation) pairs per engine
+        batch; once exhausted, `translation_result` holds the document.
+        Documents found in the content store yield no batches.
+        """
+        if TranslationContent.objects.reuse([self]):
+            self.status = STATUS_DONE
+            self.error = ''
+            return
+
+        document = parse_document(self.content_type, self.translation_input)
+        segments = document.segments
+        observe_document(self.content_type, len(segments))
+        engine = get_engine()
+        translated = {}
+        for chunk in chunk_segments(
+            unique_segments(segments), engine.max_segments, engine.max_bytes
+        ):
+            translated.update(zip(chunk, self.translate_text(chunk)))
+            batch = set(chunk)
+            yield [
+                (index, translated[segment])
+                for index, segment in enumerate(segments)
+                if segment in batch
+            ]
+
+        self.translation_result = document.render(
+            [translated.get(segment, segment) for segment in segments]
+        )
+        TranslationContent.objects.store([self])
+        self.status = STATUS_DONE
+        self.error = ''
+
+    def translate_html(self, tags=None, previous=None):
+        """Translate HTML tags.
+
+        Segments found in `previous`, a mapping of segment to translation,
+        are not translated again.
+        """
+        document = parse_html(self.translation_input)
+        observe_document(self.content_type, len(document.segments))
+        previous = previous or {}
+        segments = [
+            segment for segment in document.segments
+            if segment not in previous
+        ]
+        if not segments:
+            translated = {}
+        elif getattr(settings, 'TRANSLATION_BATCH_SEGMENTS', True):
+            # One engine call per chunk of unique segments.
+            translated = dict(zip(
+                segments, self.translate_text(segments)
+            ))
+        else:
+            translated = {
+                segment: self.translate_text(segment)
+                for segment in segments
+            }
+
+        return document.render([
+            previous[segment] if segment in previous else translated[segment]
+            for segment in document.segments
+        ])
+
+    def get_content_key(self):
+        """Return the key of the input in the content store."""
+        return document_key(
+            self.translation_input, self.target_lang, self.content_type
+        )
+
     def get_soup_content(self):
         """Get BeautifulSoup object from input."""
         return BeautifulSoup(self.translation_input, 'html.parser')
 
+    def translate_text(self, text):
+        """Translate a text, or a list of texts, to the target language.
+
+        Lists are de-duplicated, looked up in the translation memory and
+        the remaining segments are sent in as few requests as the engine
+        limits allow; the result keeps the order of the input.
+        """
+        if isinstance(text, str):
+            return self.translate_text([text])[0]
+
+        return translate_segments(
+            text,
+            get_engine(),
+            target_lang=self.target_lang,
+            content_type=self.content_type,
+        )
+
     def translate_to_german(self, text):
-        if not self._translator:
-            auth_key = DEEPL_AUTH_KEY
-            if not auth_key:
-                raise ValueError("DEEPL_AUTH_KEY must be set.")
-            self._translator = Translator(auth_key)
-        # print(text)
-        translation_output = self._translator.translate_text(text, target_lang='DE')
-        return translation_output
-
-    def save(self, *args, **kwargs):
-        # Call translate_input method before saving the object.
-        self.translate_input()
+        """Translate a text, or a list of texts, to German."""
+        if isinstance(text, str):
+            return self.translate_to_german([text])[0]
+
+        return translate_segments(
+            text,
+            get_engine(),
+            target_lang='DE',
+            content_type=self.content_type,
+        )
+
+    def run_job(self):
+        """Translate a claimed job and record whether it succeeded.
+
+        Nothing is saved if the input was edited, and translated by that
+        save, while the job ran.
+        """
+        try:
+            self.translate_input()
+        except Exception as exc:
+            self.status = STATUS_FAILED
+            self.error = str(exc)
+        else:
+            self.status = STATUS_DONE
+            self.error = ''
+        fields = ['content_type', 'target_lang', 'input_text', 'content_id']
+        with transaction.atomic():
+            current = Translation.objects.select_for_update().filter(
+                pk=self.pk,
+            ).values_list(*fields).first()
+            if current != tuple(self._saved.get(name) for name in fields):
+                return
+            self.save(translate=False)
+
+    def save(self, *args, translate=True, **kwargs):
+        # Call translate_input method before saving the object, unless
+        # the input is unchanged since it was last translated.
+        # Pending jobs are translated later by the translation worker.
+        if translate and self.status != STATUS_PENDING and (
+            self.input_changed() or self.status != STATUS_DONE
+        ):
+            self.translate_input()
+            self.status = STATUS_DONE
+            self.error = ''
+        self.share_content_text()
+        previous = getattr(self, '_saved', {}).get('content_id')
         super().save(*args, **kwargs)
+        if previous != self.content_id:
+            TranslationContent.objects.prune([previous])
+        self._remember_saved_input()
 
     def to_json(self):
-        return json.dumps({
+        return dumps({
             'id': int(self.id),
             'user': self.user.email,
             'content_type': self.content_type,
+            'target_lang': self.target_lang,
             'translation_input': self.translation_input,
             'translation_elements': self.translation_elements,
             'translation_result': self.translation_result,
-        })
+        }).decode()
+
+
+def _replace(manager, objects, fields):
+    """Save objects, overwriting `fields` of those whose key exists."""
+    objects = {obj.key: obj for obj in objects}
+    existing = set(
+        manager.filter(key__in=objects).values_list('key', flat=True)
+    )
+    now = timezone.now()
+    for key in existing:
+        objects[key].created_at = now
+    manager.bulk_update(
+        [objects[key] for key in existing], [*fields, 'created_at'],
+    )
+    manager.bulk_create(
+        [obj for key, obj in objects.items() if key not in existing],
+        ignore_conflicts=True,
+    )
+
+
+class TranslationMemoryManager(models.Manager):
+    """Manager for the translation memory."""
+
+    def lookup(self, keys, since=None):
+        """Return a mapping of key to translated text for known keys.
+
+        With `since`, only entries stored since then are returned.
+        """
+        entries = self.filter(key__in=list(keys))
+        if since is not None:
+            entries = entries.filter(created_at__gte=since)
+
+        return dict(entries.values_list('key', 'target_text'))
+
+    def store(self, entries, *, source_lang, target_lang, content_type,
+              replace=False):
+        """Save (key, source text, translated text) entries.
+
+        Keys that already exist are left untouched, unless `replace` is
+        set.
+        """
+        segments = {
+            key: self.model(
+                key=key,
+                source_lang=source_lang,
+                target_lang=target_lang,
+                content_type=content_type,
+                source_text=source_text,
+                target_text=target_text,
+            )
+            for key, source_text, target_text in entries
+        }
+        if replace:
+            _replace(self, segments.values(), ['target_text'])
+        else:
+            self.bulk_create(segments.values(), ignore_conflicts=True)
+
+
+class TranslationMemory(models.Model):
+    """Previously translated segment, keyed by a hash of its source."""
+    key = models.CharField(max_length=64, primary_key=True)
+    source_lang = models.CharField(max_length=10, blank=True)
+    target_lang = models.CharField(max_length=10)
+    content_type = \
+        models.CharField(max_length=100, choices=CONTENT_TYPE_CHOICES)
+    source_text = models.TextField()
+    target_text = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = TranslationMemoryManager()
+
+    class Meta:
+        verbose_name_plural = 'translation memory'
+
+    def __str__(self):
+        return f"{self.target_lang}: {self.source_text}"
+
+
+class TranslationContentManager(models.Manager):
+    """Manager for the content store."""
+
+    def is_enabled(self):
+        return getattr(settings, 'TRANSLATION_CONTENT_STORE', True)
+
+    def reuse(self, translations, since=None):
+        """Fill in results of documents translated before.
+
+        Looks up all translations with a single query and returns the
+        indexes of those whose result was found. With `since`, only
+        results stored since then are reused.
+        """
+        if not self.is_enabled():
+            return set()
+        keys = [translation.get_content_key() for translation in translations]
+        contents = self.filter(key__in=keys)
+        if since is not None:
+            contents = contents.filter(created_at__gte=since)
+        found = {content.key: content for content in contents}
+        reused = set()
+        for index, (translation, key) in enumerate(zip(translations, keys)):
+            if key in found:
+                translation.translation_result = \
+                    found[key].translation_result
+                translation.content = found[key]
+                translation.status = STATUS_DONE
+                reused.add(index)
+
+        return reused
+
+    def store(self, translations, replace=False):
+        """Save the results of translated documents.
+
+        Keys that already exist are left untouched, unless `replace` is
+        set.
+        """
+        if not self.is_enabled():
+            return
+        contents = {}
+        for translation in translations:
+            if not translation.translation_input:
+                continue
+            key = translation.get_content_key()
+            translation.content = contents.setdefault(key, self.model(
+                key=key,
+                target_lang=translation.target_lang,
+                content_type=translation.content_type,
+                translation_input=translation.translation_input,
+                translation_result=translation.translation_result,
+            ))
+        if replace:
+            _replace(self, contents.values(), ['translation_result'])
+        else:
+            self.bulk_create(contents.values(), ignore_conflicts=True)
+
+    def prune(self, keys):
+        """Delete the documents of `keys` no translation refers to.
+
+        Documents hold user input, so they are not kept once the last
+        translation using them is deleted or edited.
+        """
+        keys = {key for key in keys if key}
+        if keys:
+            self.filter(key__in=keys, translations__isnull=True).delete()
+
+
+class TranslationContent(models.Model):
+    """Translated document, keyed by a hash of its input.
+
+    Shared by all translations of an identical input, of any user.
+    """
+    key = models.CharField(max_length=64, primary_key=True)
+    target_lang = models.CharField(max_length=10)
+    content_type = \
+        models.CharField(max_length=100, choices=CONTENT_TYPE_CHOICES)
+    translation_input = models.TextField()
+    translation_result = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = TranslationContentManager()
+
+    def __str__(self):
+        return f"{self.target_lang}: {self.translation_input[:50]}"
+
+
+def prune_translation_content(sender, instance, **kwargs):
+    """Delete the document of a deleted translation, if now unused."""
+    TranslationContent.objects.prune([instance.content_id])
+
+
+post_delete.connect(prune_translation_content, sender=Translation)
@@ -0,0 +1,137 @@
+"""
+Opt-in profiling of single requests.
+
+Requests sent with an `X-Profile` header record how long they spent in
+each phase (auth, HTML parsing, engine calls, serialization and database
+queries). The timings are returned as a `Server-Timing` header to staff
+users, or to anyone when DEBUG is on. With `X-Profile: cprofile` and
+PROFILING_DIR set, a cProfile dump of the request is written as well.
+Authentication happens in the views, so cProfile is only started once a
+view reports a staff user with `authenticated`; the dump covers the
+request from there on.
+
+Requests without the header only pay for a context variable lookup per
+phase.
+"""
+import cProfile
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+_timings = ContextVar('profiling_timings', default=None)
+_profiler = ContextVar('profiling_request', default=None)
+
+
+class Timings:
+    """Total duration and count of every phase of a request."""
+
+    def __init__(self):
+        self.phases = {}
+        # Engine calls may run in a thread pool.
+        self._lock = threading.Lock()
+
+    def add(self, name, duration):
+        with self._lock:
+            total, count = self.phases.get(name, (0.0, 0))
+            self.phases[name] = (total + duration, count + 1)
+
+    def header(self, total):
+        """Return the timings as a Server-Timing header value."""
+        metrics = [
+            f'{name};dur={duration * 1000:.1f};desc="{count}x"'
+            for name, (duration, count) in self.phases.items()
+        ]
+        metrics.append(f'total;dur={total * 1000:.1f}')
+
+        return ', '.join(metrics)
+
+
+@contextmanager
+def phase(name):
+    """Add the time spent in the block to a phase of the request."""
+    timings = _timings.get()
+    if timings is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - start)
+
+
+def time_query(execute, sql, params, many, context):
+    """Database execute wrapper timing queries as the `db` phase."""
+    with phase('db'):
+        return execute(sql, params, many, context)
+
+
+def is_requested(request):
+    """Return whether the request asks to be profiled."""
+    return 'HTTP_X_PROFILE' in request.META
+
+
+def is_allowed(user):
+    """Return whether the user may see the profile of a request."""
+    return settings.DEBUG or getattr(user, 'is_staff', False)
+
+
+def authenticated(user):
+    """Start cProfile for the current request, if asked for and allowed."""
+    profiler = _profiler.get()
+    if profiler is not None:
+        profiler.start_profile(user)
+
+
+class RequestProfiler:
+    """Context manager profiling a request."""
+
+    def __init__(self, request):
+        self.directory = getattr(settings, 'PROFILING_DIR', None)
+        self.wants_profile = bool(self.directory) and \
+            request.META['HTTP_X_PROFILE'].lower() == 'cprofile'
+        self.profile = None
+
+    def __enter__(self):
+        self.timings = Timings()
+        self._tokens = (_timings.set(self.timings), _profiler.set(self))
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.profile:
+            self.profile.disable()
+        self.duration = time.perf_counter() - self.start
+        _timings.reset(self._tokens[0])
+        _profiler.reset(self._tokens[1])
+
+    def start_profile(self, user):
+        """Start cProfile, if it was asked for and the user may see it."""
+        if self.wants_profile and self.profile is None and is_allowed(user):
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+
+    def finish(self, request, response):
+        """Add the results to the response, if the user may see them."""
+        if not is_allowed(getattr(request, 'user', None)):
+            return response
+
+        response['Server-Timing'] = self.timings.header(self.duration)
+        if self.profile:
+            name = f'{time.strftime("%Y%m%d-%H%M%S")}-{os.getpid()}-' \
+                f'{request.method}-{request.path.strip("/")}'
+            name = ''.join(
+                char if char.isalnum() or char in '-_' else '_'
+                for char in name
+            )
+            self.profile.dump_stats(
+                os.path.join(self.directory, f'{name}.prof')
+            )
+            response['X-Profile-File'] = f'{name}.prof'
+
+        return response
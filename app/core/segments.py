@@ -0,0 +1,368 @@
+"""
+Helpers for batching translatable segments.
+"""
+import asyncio
+import contextvars
+import hashlib
+import re
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from urllib.parse import quote_plus
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+
+from core.metrics import observe_engine_call, observe_segments
+from core.profiling import phase
+
+# DeepL accepts up to 50 texts and 128 KiB of request body per call.
+MAX_SEGMENTS_PER_REQUEST = 50
+MAX_REQUEST_BYTES = 128 * 1024
+# Room left in every request for auth, target_lang and other parameters.
+REQUEST_OVERHEAD_BYTES = 1024
+
+
+def encoded_size(segment):
+    """Return the size of a segment as a form-encoded `text` parameter."""
+    return len('&text=') + len(quote_plus(segment))
+
+
+def chunk_segments(segments,
+                   max_segments=MAX_SEGMENTS_PER_REQUEST,
+                   max_bytes=MAX_REQUEST_BYTES):
+    """Yield lists of segments that fit into a single engine request.
+
+    A segment that exceeds `max_bytes` on its own is yielded alone and
+    left to the engine to reject.
+    """
+    budget = max_bytes - REQUEST_OVERHEAD_BYTES
+    chunk = []
+    chunk_size = 0
+    for segment in segments:
+        size = encoded_size(segment)
+        if chunk and (
+            len(chunk) >= max_segments or chunk_size + size > budget
+        ):
+            yield chunk
+            chunk = []
+            chunk_size = 0
+        chunk.append(segment)
+        chunk_size += size
+    if chunk:
+        yield chunk
+
+
+def split_whitespace(segment):
+    """Split a segment into leading whitespace, text and trailing space."""
+    match = re.match(r'(\s*)(.*?)(\s*)$', segment, re.DOTALL)
+    return match.groups()
+
+
+def normalize_segment(segment):
+    """Return the segment with whitespace runs collapsed."""
+    return ' '.join(segment.split())
+
+
+def segment_key(segment, target_lang, content_type, source_lang=''):
+    """Return the translation memory key of a segment."""
+    parts = [
+        normalize_segment(segment),
+        source_lang.upper(),
+        target_lang.upper(),
+        content_type,
+    ]
+    return hashlib.sha256('\x1f'.join(parts).encode()).hexdigest()
+
+
+def document_key(text, target_lang, content_type):
+    """Return the content store key of a whole document.
+
+    Unlike segments, documents are hashed verbatim: the stored result is
+    reused as is, so inputs may only share it if they are identical.
+    """
+    parts = ['document', target_lang.upper(), content_type, text]
+    return hashlib.sha256('\x1f'.join(parts).encode()).hexdigest()
+
+
+class SegmentBatch:
+    """Segments to translate, and the translations found for them so far.
+
+    `recall` serves known segments from the in-process cache first and
+    then from the translation memory, which is read with a single query
+    for all remaining segments. `remember` writes new translations back
+    to both. Segments are de-duplicated and trimmed before lookup, and
+    leading and trailing whitespace is restored by `result`.
+
+    With `fresh_since`, only memory entries stored since then are reused
+    and older ones are replaced, so everything is translated again once.
+    """
+
+    def __init__(self, segments, *, target_lang, content_type,
+                 source_lang='', fresh_since=None):
+        self.segments = segments
+        self.target_lang = target_lang
+        self.content_type = content_type
+        self.source_lang = source_lang
+        self.fresh_since = fresh_since
+        self.texts = unique_segments(
+            split_whitespace(segment)[1] for segment in segments
+        )
+        self.keys = {
+            text: segment_key(text, target_lang, content_type, source_lang)
+            for text in self.texts
+        }
+        self.translated = {}
+        self.use_memory = getattr(settings, 'TRANSLATION_MEMORY', True)
+
+    def recall(self):
+        """Look up known translations and return the missing texts."""
+        from core.cache import get_segment_cache
+        from core.models import TranslationMemory
+
+        cache = get_segment_cache()
+        if self.fresh_since is None:
+            found = cache.get_many(list(self.keys.values()))
+        else:
+            # The cache does not know when its entries were stored.
+            found = {}
+        cached = len(found)
+        if self.use_memory and len(found) < len(self.keys):
+            remembered = TranslationMemory.objects.lookup(
+                (key for key in self.keys.values() if key not in found),
+                since=self.fresh_since,
+            )
+            cache.set_many(remembered)
+            found.update(remembered)
+        self.translated.update(
+            (text, found[key])
+            for text, key in self.keys.items() if key in found
+        )
+        missing = [text for text in self.texts if text not in self.translated]
+        observe_segments(
+            cached=cached,
+            remembered=len(found) - cached,
+            missing=len(missing),
+        )
+
+        return missing
+
+    def remember(self, translations):
+        """Add new translations and write them back."""
+        from core.cache import get_segment_cache
+        from core.models import TranslationMemory
+
+        if not translations:
+            return
+        self.translated.update(translations)
+        get_segment_cache().set_many({
+            self.keys[text]: translated
+            for text, translated in translations.items()
+        })
+        if self.use_memory:
+            TranslationMemory.objects.store(
+                [
+                    (self.keys[text], text, translated)
+                    for text, translated in translations.items()
+                ],
+                source_lang=self.source_lang,
+                target_lang=self.target_lang,
+                content_type=self.content_type,
+                replace=self.fresh_since is not None,
+            )
+
+    def result(self):
+        """Return the translations of all segments, in order."""
+        result = []
+        for segment in self.segments:
+            lead, text, trail = split_whitespace(segment)
+            result.append(lead + self.translated.get(text, text) + trail)
+
+        return result
+
+
+def translate_segments(segments, engine, *,
+                       target_lang, content_type, source_lang=''):
+    """Translate segments, reusing earlier translations where possible.
+
+    The engine is called with the unknown segments, chunked to the
+    engine's request limits. With TRANSLATION_THREAD_POOL_SIZE above 1
+    the chunks are translated concurrently in a thread pool.
+    """
+    return translate_segments_multi(
+        segments,
+        engine,
+        target_langs=[target_lang],
+        content_type=content_type,
+        source_lang=source_lang,
+    )[target_lang]
+
+
+def translate_segments_multi(segments, engine, *,
+                             target_langs, content_type, source_lang=''):
+    """Translate segments into several languages.
+
+    Works like `translate_segments` for every language, but the engine
+    requests of all languages share one thread pool, so they are issued
+    concurrently. Returns a mapping of language to translations.
+    """
+    results = translate_segment_groups(
+        {
+            (content_type, target_lang): segments
+            for target_lang in target_langs
+        },
+        engine,
+        source_lang=source_lang,
+    )
+
+    return {
+        target_lang: results[content_type, target_lang]
+        for target_lang in target_langs
+    }
+
+
+def translate_segment_groups(groups, engine, *, source_lang='',
+                             workers=None, fresh_since=None):
+    """Translate lists of segments of different content types and languages.
+
+    `groups` maps (content type, target language) pairs to segments; the
+    same mapping is returned with their translations. The engine
+    requests of all groups share one thread pool of `workers` threads,
+    TRANSLATION_THREAD_POOL_SIZE by default. `fresh_since` is passed on
+    to `SegmentBatch`.
+    """
+    batches = {
+        (content_type, target_lang): SegmentBatch(
+            segments,
+            target_lang=target_lang,
+            content_type=content_type,
+            source_lang=source_lang,
+            fresh_since=fresh_since,
+        )
+        for (content_type, target_lang), segments in groups.items()
+    }
+    requests = [
+        (chunk, group)
+        for group, batch in batches.items()
+        for chunk in chunk_segments(
+            batch.recall(), engine.max_segments, engine.max_bytes
+        )
+    ]
+    if workers is None:
+        workers = getattr(settings, 'TRANSLATION_THREAD_POOL_SIZE', 1)
+    workers = min(workers, len(requests))
+    if workers > 1:
+        results = _translate_chunks_concurrently(
+            [(chunk, target_lang) for chunk, (_, target_lang) in requests],
+            engine,
+            workers,
+            source_lang=source_lang or None,
+        )
+    else:
+        results = [
+            translate_chunk(
+                engine,
+                chunk,
+                target_lang=target_lang,
+                source_lang=source_lang or None,
+            )
+            for chunk, (_, target_lang) in requests
+        ]
+
+    translations = {group: {} for group in batches}
+    for (chunk, group), chunk_results in zip(requests, results):
+        translations[group].update(zip(chunk, chunk_results))
+    for group, batch in batches.items():
+        batch.remember(translations[group])
+
+    return {group: batch.result() for group, batch in batches.items()}
+
+
+def translate_chunk(engine, chunk, *, target_lang, source_lang=None):
+    """Send one chunk of segments to the engine, recording metrics."""
+    with phase('engine'), observe_engine_call(engine, chunk, target_lang):
+        return engine.translate(
+            chunk, target_lang=target_lang, source_lang=source_lang,
+        )
+
+
+def _translate_chunks_concurrently(requests, engine, workers, **kwargs):
+    """Translate (chunk, target language) pairs in a thread pool.
+
+    Results are returned in order. Chunks not yet started are cancelled
+    as soon as one chunk fails, and the error is raised.
+    """
+    with ThreadPoolExecutor(
+        max_workers=workers, thread_name_prefix='translation',
+    ) as executor:
+        futures = [
+            # Run in a copy of the context, so profiling sees the call.
+            executor.submit(
+                contextvars.copy_context().run,
+                translate_chunk, engine, chunk,
+                target_lang=target_lang, **kwargs
+            )
+            for chunk, target_lang in requests
+        ]
+        done, pending = wait(futures, return_when=FIRST_EXCEPTION)
+        for future in done:
+            if future.exception() is not None:
+                for other in pending:
+                    other.cancel()
+                raise future.exception()
+
+    return [future.result() for future in futures]
+
+
+async def atranslate_segments(segments, engine, *,
+                              target_lang, content_type, source_lang=''):
+    """Translate segments like `translate_segments`, without blocking.
+
+    Chunks are sent to the engine concurrently, at most
+    TRANSLATION_ASYNC_CONCURRENCY at a time. Outstanding chunks are
+    cancelled when one of them fails.
+    """
+    batch = SegmentBatch(
+        segments,
+        target_lang=target_lang,
+        content_type=content_type,
+        source_lang=source_lang,
+    )
+    missing = await sync_to_async(batch.recall)()
+    semaphore = asyncio.Semaphore(
+        getattr(settings, 'TRANSLATION_ASYNC_CONCURRENCY', 8)
+    )
+
+    async def translate_chunk(chunk):
+        async with semaphore:
+            with phase('engine'), \
+                    observe_engine_call(engine, chunk, target_lang):
+                return chunk, await engine.atranslate(
+                    chunk,
+                    target_lang=target_lang,
+                    source_lang=source_lang or None,
+                )
+
+    tasks = [
+        asyncio.ensure_future(translate_chunk(chunk))
+        for chunk in chunk_segments(
+            missing, engine.max_segments, engine.max_bytes
+        )
+    ]
+    translations = {}
+    try:
+        for chunk, results in await asyncio.gather(*tasks):
+            translations.update(zip(chunk, results))
+    finally:
+        for task in tasks:
+            task.cancel()
+    await sync_to_async(batch.remember)(translations)
+
+    return batch.result()
+
+
+def unique_segments(segments):
+    """Return the translatable segments without duplicates, in order."""
+    return [
+        segment for segment in dict.fromkeys(segments)
+        if segment.strip()
+    ]
@@ -0,0 +1,65 @@
+"""
+Tests for the segment cache.
+"""
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from core.cache import SegmentCache
+
+
+class SegmentCacheTests(SimpleTestCase):
+    """Test the in-process segment cache."""
+
+    def test_least_recently_used_evicted(self):
+        """Test the least recently used entry is evicted first."""
+        cache = SegmentCache(max_entries=2, max_bytes=10000, timeout=60)
+        cache.set_many({'a': 'A', 'b': 'B'})
+        cache.get_many(['a'])
+        cache.set_many({'c': 'C'})
+
+        self.assertEqual(cache.get_many(['a', 'b', 'c']), {'a': 'A', 'c': 'C'})
+        stats = cache.stats()
+        self.assertEqual(stats['evictions'], 1)
+        self.assertEqual(stats['hits'], 3)
+        self.assertEqual(stats['misses'], 1)
+
+    def test_byte_budget_enforced(self):
+        """Test entries are evicted to stay within the byte budget."""
+        cache = SegmentCache(max_entries=100, max_bytes=500, timeout=60)
+        cache.set_many({str(i): 'x' * 100 for i in range(10)})
+
+        self.assertLessEqual(cache.stats()['bytes'], 500)
+        self.assertIn('9', cache.get_many(['9']))
+
+    @patch('core.cache.time.monotonic')
+    def test_expired_entries_missed(self, patched_monotonic):
+        """Test entries are not returned after their timeout."""
+        patched_monotonic.return_value = 100
+        cache = SegmentCache(max_entries=10, max_bytes=10000, timeout=60)
+        cache.set_many({'a': 'A'})
+        patched_monotonic.return_value = 161
+
+        self.assertEqual(cache.get_many(['a']), {})
+        self.assertEqual(cache.stats()['expirations'], 1)
+
+    def test_shared_cache_tier(self):
+        """Test misses fall back to the shared Django cache."""
+        first = SegmentCache(10, 10000, 60, shared_cache='default')
+        second = SegmentCache(10, 10000, 60, shared_cache='default')
+        first.set_many({'a': 'A'})
+
+        self.assertEqual(second.get_many(['a']), {'a': 'A'})
+        self.assertEqual(second.stats()['shared_hits'], 1)
+
+    def test_delete_many(self):
+        """Test deleted keys are gone from both tiers."""
+        cache = SegmentCache(10, 10000, 60, shared_cache='default')
+        cache.set_many({'a': 'A', 'b': 'B'})
+
+        cache.delete_many(['a'])
+
+        other = SegmentCache(10, 10000, 60, shared_cache='default')
+        self.assertEqual(cache.get_many(['a', 'b']), {'b': 'B'})
+        self.assertEqual(other.get_many(['a', 'b']), {'b': 'B'})
+        self.assertEqual(cache.stats()['bytes'], cache._entry_size('b', 'B'))
@@ -1,35 +1,462 @@
 """
 Test custom Django management commands.
 """
+import gzip
+import json
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
 from unittest.mock import patch
 
 from psycopg2 import OperationalError as Psycopg2OpError
 
-from django.core.management import call_command
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
 from django.db.utils import OperationalError
-from django.test import SimpleTestCase
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
 
+from core.cache import get_segment_cache
+from core.documents import parse_html
+from core.engines import get_engine
+from core.management.commands.bench_translation import generate_html
+from core.models import Translation, TranslationContent, TranslationMemory
+from core.segments import (
+    MAX_REQUEST_BYTES,
+    MAX_SEGMENTS_PER_REQUEST,
+    chunk_segments,
+    segment_key,
+    translate_segments,
+    unique_segments,
+)
 
-@patch('core.management.commands.wait_for_db.Command.check')
+
+@patch('core.management.commands.wait_for_db.Command.probe')
 class CommandTests(SimpleTestCase):
     """Test commands."""
 
-    def test_wait_for_db_ready(self, patched_check):
+    def test_wait_for_db_ready(self, patched_probe):
         """Test waiting for database if database ready."""
-        patched_check.return_value = True
-
-        call_command('wait_for_db')
+        call_command('wait_for_db', stdout=StringIO())
 
-        patched_check.assert_called_once_with(databases=['default'])
+        patched_probe.assert_called_once_with()
 
     @patch('time.sleep')
-    def test_wait_for_db_delay(self, patched_sleep, patched_check):
+    def test_wait_for_db_delay(self, patched_sleep, patched_probe):
         """Test waiting for db when getting OperationalError."""
-        patched_check.side_effect = [Psycopg2OpError] * 2 + \
-            [OperationalError] * 3 + [True]
-        """The sixth time True is returned."""
+        patched_probe.side_effect = [Psycopg2OpError] * 2 + \
+            [OperationalError] * 3 + [None]
+
+        call_command('wait_for_db', '--max-delay', '0.4', stdout=StringIO())
+
+        self.assertEqual(patched_probe.call_count, 6)
+        self.assertEqual(patched_sleep.call_count, 5)
+        for (wait,), _ in patched_sleep.call_args_list:
+            self.assertLessEqual(wait, 0.4)
+
+    @patch('time.sleep')
+    def test_wait_for_db_deadline(self, patched_sleep, patched_probe):
+        """Test giving up once the deadline has passed."""
+        patched_probe.side_effect = OperationalError
+
+        with self.assertRaises(CommandError):
+            call_command('wait_for_db', '--timeout', '0', stdout=StringIO())
+
+        patched_probe.assert_called_once_with()
+
+
+class BenchmarkCommandTests(SimpleTestCase):
+    """Test the translation benchmark command."""
+
+    def test_bench_translation_reports_json(self):
+        """Test the benchmark writes a machine-readable report."""
+        out = StringIO()
+
+        call_command(
+            'bench_translation', '--sizes', '1,2', '--repeat', '1',
+            stdout=out, stderr=StringIO(),
+        )
+
+        report = json.loads(out.getvalue())
+        self.assertEqual(
+            [result['parser'] for result in report['results']],
+            ['soup', 'tokenizer'] * 2,
+        )
+        result = report['results'][0]
+        self.assertGreater(result['nodes'], 0)
+        self.assertEqual(result['engine_calls'], 1)
+        for key in ('parse_seconds', 'traverse_seconds',
+                    'serialize_seconds', 'translate_html_seconds',
+                    'peak_memory_bytes'):
+            self.assertIn(key, result)
+
+    def test_bench_translation_counts_engine_calls(self):
+        """Test the benchmark reports the calls the pipeline makes."""
+        reports = []
+        for args in ([], ['--no-batch-segments']):
+            out = StringIO()
+            call_command(
+                'bench_translation', '--sizes', '10', '--repeat', '2',
+                '--parser', 'tokenizer', *args,
+                stdout=out, stderr=StringIO(),
+            )
+            reports.append(json.loads(out.getvalue()))
+
+        batched, unbatched = reports
+        self.assertTrue(batched['batch_segments'])
+        self.assertFalse(unbatched['batch_segments'])
+        segments = parse_html(generate_html(10 * 1024)).segments
+        chunks = chunk_segments(
+            unique_segments(segment.strip() for segment in segments),
+            MAX_SEGMENTS_PER_REQUEST, MAX_REQUEST_BYTES,
+        )
+        self.assertEqual(
+            batched['results'][0]['engine_calls'], len(list(chunks)),
+        )
+        # Nothing is cached, so repeated segments are sent again.
+        self.assertGreater(len(segments), len(set(segments)))
+        self.assertEqual(
+            unbatched['results'][0]['engine_calls'], len(segments),
+        )
+
+    def test_bench_renderers_reports_json(self):
+        """Test the renderer benchmark reports every renderer."""
+        out = StringIO()
+
+        call_command(
+            'bench_renderers', '--items', '2', '--sizes', '1',
+            '--repeat', '1', stdout=out, stderr=StringIO(),
+        )
+
+        report = json.loads(out.getvalue())
+        self.assertEqual(
+            [result['renderer'] for result in report['results']],
+            ['json', 'orjson', 'msgpack'],
+        )
+        for result in report['results']:
+            self.assertGreater(result['payload_bytes'], 2048)
+
+
+class ExplainQueriesCommandTests(TestCase):
+    """Test the query plan command."""
+
+    def test_explain_queries_seeded(self):
+        """Test plans are captured and seeded rows are rolled back."""
+        out = StringIO()
+
+        call_command('explain_queries', '--seed', '10', stdout=out)
+
+        self.assertIn('translation_list_page', out.getvalue())
+        self.assertIn('Buffers', out.getvalue())
+        self.assertFalse(Translation.objects.exists())
+
+
+class ExportCommandTests(TestCase):
+    """Test the export command."""
+
+    def test_export_translations_gzip(self):
+        """Test all translations are exported with their user."""
+        user = get_user_model().objects.create_user(
+            'test@example.com', 'testpass123'
+        )
+        Translation.objects.bulk_create(
+            Translation(
+                user=user, content_type='html',
+                translation_input=f'<p>{i}</p>',
+            )
+            for i in range(5)
+        )
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'export.ndjson.gz')
+            call_command(
+                'export_translations', '--gzip', '--chunk-size', '2',
+                '--output', path,
+            )
+            with gzip.open(path) as export:
+                rows = [json.loads(line) for line in export]
+
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[0]['user__email'], 'test@example.com')
+        self.assertEqual(rows[4]['translation_input'], '<p>4</p>')
+
+
+class TranslationMemoryCommandTests(TestCase):
+    """Test the translation memory import and export commands."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w', encoding='utf-8') as tm_file:
+            tm_file.write(content)
+
+        return path
+
+    def test_import_tsv_upserts(self):
+        """Test TSV entries are keyed like segments and replace old ones."""
+        TranslationMemory.objects.create(
+            key=segment_key('Hello', 'DE', 'html'), target_lang='DE',
+            content_type='html', source_text='Hello', target_text='Hi',
+        )
+        path = self.write(
+            'memory.tsv',
+            ' Hello \tHallo\\nWelt\n'
+            'Tab\\there\tTab\\tda\n'
+            'Tab\\there\tTab da\n',
+        )
+        err = StringIO()
+
+        call_command(
+            'import_translation_memory', path, '--target-lang', 'de',
+            '--batch-size', '2', stdout=StringIO(), stderr=err,
+        )
+
+        memory = TranslationMemory.objects.lookup([
+            segment_key('Hello', 'DE', 'html'),
+            segment_key('Tab\there', 'DE', 'html'),
+        ])
+        self.assertEqual(
+            sorted(memory.values()), ['Hallo\nWelt', 'Tab da'],
+        )
+        self.assertIn('Imported 2 entries', err.getvalue())
+        self.assertIn('Imported 3 entries', err.getvalue())
+
+    @override_settings(TRANSLATION_CACHE={'SHARED_CACHE': 'default'})
+    def test_import_invalidates_segment_cache(self):
+        """Test imported segments are not served from the cache."""
+        key = segment_key('Hello', 'DE', 'html')
+        get_segment_cache().set_many({key: 'Hi'})
+        path = self.write('memory.tsv', 'Hello\tHallo\n')
+
+        call_command(
+            'import_translation_memory', path, '--target-lang', 'DE',
+            stdout=StringIO(), stderr=StringIO(),
+        )
+
+        self.assertEqual(get_segment_cache().get_many([key]), {})
+        self.assertEqual(translate_segments(
+            ['Hello'], get_engine(), target_lang='DE', content_type='html',
+        ), ['Hallo'])
+
+    def test_import_tmx(self):
+        """Test TMX units are matched by language and markup dropped."""
+        path = self.write('memory.tmx', (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<tmx version="1.4"><header srclang="en-US"/><body>'
+            '<tu><tuv xml:lang="en-US"><seg>Save <ph>&lt;b&gt;</ph>'
+            'now</seg></tuv><tuv xml:lang="de-DE"><seg>Jetzt speichern'
+            '</seg></tuv></tu>'
+            '<tu><tuv xml:lang="en-US"><seg>Only English</seg></tuv></tu>'
+            '</body></tmx>'
+        ))
+
+        call_command(
+            'import_translation_memory', path, '--source-lang', 'en',
+            '--target-lang', 'DE', '--content-type', 'plain_text',
+            stdout=StringIO(), stderr=StringIO(),
+        )
+
+        entry = TranslationMemory.objects.get()
+        self.assertEqual(entry.source_text, 'Save <b>now')
+        self.assertEqual(entry.target_text, 'Jetzt speichern')
+        self.assertEqual(
+            entry.key, segment_key('Save <b>now', 'DE', 'plain_text'),
+        )
+
+    def test_import_rejects_malformed_tsv(self):
+        """Test a line without two fields fails the import."""
+        path = self.write('memory.tsv', 'no tab here\n')
+
+        with self.assertRaisesMessage(CommandError, 'Line 1'):
+            call_command(
+                'import_translation_memory', path, '--target-lang', 'DE',
+                stdout=StringIO(), stderr=StringIO(),
+            )
+
+    def test_export_round_trip(self):
+        """Test exported TSV and TMX files can be imported again."""
+        TranslationMemory.objects.create(
+            key=segment_key('A\tB\\C', 'FR', 'html'), target_lang='FR',
+            content_type='html', source_text='A\tB\\C',
+            target_text='<x> & "y"',
+        )
+        for file_format in ('tsv', 'tmx'):
+            path = os.path.join(self.directory.name, f'out.{file_format}')
+            call_command(
+                'export_translation_memory', '--target-lang', 'fr',
+                '--format', file_format, '--source-lang', 'EN',
+                '--output', path, stderr=StringIO(),
+            )
+            TranslationMemory.objects.all().delete()
+
+            call_command(
+                'import_translation_memory', path, '--target-lang', 'FR',
+                '--source-lang', 'EN', stdout=StringIO(), stderr=StringIO(),
+            )
+
+            entry = TranslationMemory.objects.get()
+            self.assertEqual(entry.source_text, 'A\tB\\C')
+            self.assertEqual(entry.target_text, '<x> & "y"')
+
+    def test_export_round_trip_control_characters(self):
+        """Test characters COPY escapes survive a TSV round trip."""
+        text = 'a\bb\fc\vd\re\nf'
+        TranslationMemory.objects.create(
+            key=segment_key(text, 'FR', 'html'), target_lang='FR',
+            content_type='html', source_text=text, target_text=text,
+        )
+        path = os.path.join(self.directory.name, 'out.tsv')
+        call_command(
+            'export_translation_memory', '--target-lang', 'FR',
+            '--output', path, stderr=StringIO(),
+        )
+        TranslationMemory.objects.all().delete()
+
+        call_command(
+            'import_translation_memory', path, '--target-lang', 'FR',
+            stdout=StringIO(), stderr=StringIO(),
+        )
+
+        entry = TranslationMemory.objects.get()
+        self.assertEqual(entry.source_text, text)
+        self.assertEqual(entry.target_text, text)
+
+
+@override_settings(TRANSLATION_ENGINE={
+    'BACKEND': 'core.engines.FakeEngine',
+    'OPTIONS': {'template': 'NEW {text}'},
+})
+class RetranslateCommandTests(TestCase):
+    """Test the re-translation command."""
+
+    def setUp(self):
+        user = get_user_model().objects.create_user(
+            'test@example.com', 'testpass123'
+        )
+        self.translations = Translation.objects.bulk_create(
+            Translation(
+                user=user, content_type='html',
+                translation_input=f'<p>Shared</p><p>Text {i}</p>',
+                translation_result=f'<p>OLD Shared</p><p>OLD Text {i}</p>',
+            )
+            for i in range(3)
+        )
+        TranslationMemory.objects.create(
+            key=segment_key('Shared', 'DE', 'html'), target_lang='DE',
+            content_type='html', source_text='Shared',
+            target_text='OLD Shared',
+        )
+        get_segment_cache().clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.checkpoint = os.path.join(directory.name, 'checkpoint.json')
+
+    def test_retranslate_replaces_stored_translations(self):
+        """Test rows, memory and content store get the new translations."""
+        call_command(
+            'retranslate', '--batch-size', '2', '--workers', '2',
+            '--checkpoint', self.checkpoint,
+            stdout=StringIO(), stderr=StringIO(),
+        )
+
+        for translation in self.translations:
+            translation.refresh_from_db()
+            self.assertTrue(translation.translation_result.startswith(
+                '<p>NEW Shared</p><p>NEW Text'
+            ))
+            self.assertEqual(translation.content_id,
+                             translation.get_content_key())
+        self.assertEqual(
+            TranslationMemory.objects.lookup(
+                [segment_key('Shared', 'DE', 'html')]
+            ).popitem()[1],
+            'NEW Shared',
+        )
+        self.assertEqual(TranslationContent.objects.count(), 3)
+        # "Shared" is translated again once, not once per batch.
+        self.assertEqual(get_engine().characters, len('Shared') + 3 * 6)
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+    def test_retranslate_updates_rows_sharing_documents(self):
+        """Test rows of other users sharing a document are marked changed."""
+        users = [
+            get_user_model().objects.create_user(
+                f'{name}@example.com', 'testpass123'
+            )
+            for name in ('a', 'b')
+        ]
+        first, second = (
+            Translation.objects.create(
+                user=user, content_type='html',
+                translation_input='<p>Hello</p>',
+            )
+            for user in users
+        )
+        TranslationContent.objects.filter(pk=first.content_id).update(
+            translation_result='<p>OLD Hello</p>',
+        )
+        Translation.objects.filter(pk=second.pk).update(
+            updated_at=timezone.now() - timedelta(days=1),
+        )
+        updated_at = Translation.objects.get(pk=second.pk).updated_at
+
+        call_command(
+            'retranslate', '--email', 'a@example.com',
+            stdout=StringIO(), stderr=StringIO(),
+        )
+
+        second = Translation.objects.with_content().get(pk=second.pk)
+        self.assertEqual(second.translation_result, '<p>NEW Hello</p>')
+        self.assertGreater(second.updated_at, updated_at)
+
+    def test_retranslate_resumes_from_checkpoint(self):
+        """Test rows up to the checkpoint are skipped."""
+        with open(self.checkpoint, 'w') as checkpoint:
+            json.dump({
+                'options': {
+                    'email': None, 'content_type': None,
+                    'target_lang': None, 'created_before': None,
+                    'set_target_lang': 'FR', 'reuse': False,
+                },
+                'started_at': '2026-01-01T00:00:00+00:00',
+                'last_id': self.translations[0].id,
+            }, checkpoint)
+
+        with self.assertRaisesMessage(CommandError, 'other options'):
+            call_command(
+                'retranslate', '--checkpoint', self.checkpoint,
+                stdout=StringIO(), stderr=StringIO(),
+            )
+        call_command(
+            'retranslate', '--checkpoint', self.checkpoint,
+            '--set-target-lang', 'fr', stdout=StringIO(), stderr=StringIO(),
+        )
+
+        languages = Translation.objects.order_by('id').values_list(
+            'target_lang', flat=True,
+        )
+        self.assertEqual(list(languages), ['DE', 'FR', 'FR'])
+
+    def test_retranslate_dry_run(self):
+        """Test the dry run estimates the work and changes nothing."""
+        out = StringIO()
+
+        call_command('retranslate', '--dry-run', stdout=out)
+
+        self.assertIn(
+            '3 translations: at most 24 characters in 1 engine calls',
+            out.getvalue(),
+        )
+        self.assertEqual(get_engine().calls, 0)
+        for translation in Translation.objects.with_content():
+            self.assertTrue(
+                translation.translation_result.startswith('<p>OLD')
+            )
 
-        call_command('wait_for_db')
+        call_command('retranslate', '--dry-run', '--reuse', stdout=out)
 
-        self.assertEqual(patched_check.call_count, 6)
-        patched_check.assert_called_with(databases=['default'])
+        self.assertIn('at most 18 characters', out.getvalue())
@@ -0,0 +1,54 @@
+"""
+Tests for documents.
+"""
+from django.test import SimpleTestCase, override_settings
+
+from core.documents import (
+    MalformedHtmlError,
+    SoupHtmlDocument,
+    TokenHtmlDocument,
+    parse_html,
+)
+
+
+class TokenHtmlDocumentTests(SimpleTestCase):
+    """Test the tokenizer based HTML document."""
+
+    def test_all_text_nodes_extracted(self):
+        """Test every text node is a segment, not only single children."""
+        document = TokenHtmlDocument(
+            "<p class='a'><br>first <b>bold</b> last</p><!-- note -->"
+        )
+
+        self.assertEqual(document.segments, ['first ', 'bold', ' last'])
+
+    def test_render_keeps_markup_byte_identical(self):
+        """Test only translated text changes in the rendered HTML."""
+        source = (
+            "<h2 class='x' dir=ltr>Hello &amp; bye</h2>\n"
+            "<script>if (a < b) { c(); }</script><p data-x='>'>Keep</p>"
+        )
+        document = TokenHtmlDocument(source)
+
+        self.assertEqual(document.segments, ['Hello & bye', 'Keep'])
+        self.assertEqual(
+            document.render(['Hallo & tschüss', 'Keep']),
+            "<h2 class='x' dir=ltr>Hallo &amp; tschüss</h2>\n"
+            "<script>if (a < b) { c(); }</script><p data-x='>'>Keep</p>",
+        )
+
+    def test_malformed_html_raises(self):
+        """Test markup the tokenizer does not understand is rejected."""
+        with self.assertRaises(MalformedHtmlError):
+            TokenHtmlDocument('<p>Text <b class="x>more</p>')
+
+    def test_malformed_html_falls_back_to_soup(self):
+        """Test malformed HTML is parsed with BeautifulSoup."""
+        document = parse_html('<p>Text</p><style>p {}')
+
+        self.assertIsInstance(document, SoupHtmlDocument)
+
+    @override_settings(TRANSLATION_HTML_PARSER='soup')
+    def test_soup_parser_setting(self):
+        """Test BeautifulSoup can be selected in settings."""
+        self.assertIsInstance(parse_html('<p>Text</p>'), SoupHtmlDocument)
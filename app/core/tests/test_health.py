@@ -0,0 +1,81 @@
+"""
+Tests for the health endpoints.
+"""
+import time
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core import health
+from core.engines import EngineError
+
+READYZ_URL = reverse('readyz')
+
+
+@override_settings(TRANSLATION_ENGINE={
+    'BACKEND': 'core.engines.FakeEngine',
+    'OPTIONS': {},
+})
+class HealthTests(TestCase):
+    """Test the liveness and readiness endpoints."""
+
+    def setUp(self):
+        health.clear_results()
+
+    def test_healthz(self):
+        """Test the liveness probe does not touch the database."""
+        with self.assertNumQueries(0):
+            res = self.client.get(reverse('healthz'))
+
+        self.assertEqual(res.status_code, 200)
+
+    def test_readyz(self):
+        """Test the readiness probe checks the database and engine."""
+        res = self.client.get(READYZ_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res.json()['checks']['database']['ok'])
+        self.assertTrue(res.json()['checks']['engine']['ok'])
+
+    def test_readyz_engine_unreachable(self):
+        """Test the process is not ready while the engine is down."""
+        with patch('core.engines.FakeEngine.check',
+                   side_effect=EngineError('down')):
+            res = self.client.get(READYZ_URL)
+
+        self.assertEqual(res.status_code, 503)
+        engine = res.json()['checks']['engine']
+        self.assertFalse(engine['ok'])
+        self.assertEqual(engine['error'], 'EngineError')
+
+    def test_readyz_cached(self):
+        """Test checks are not repeated within the TTL."""
+        self.client.get(READYZ_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(READYZ_URL)
+
+        self.assertEqual(res.status_code, 200)
+
+    def test_readyz_stale_result_served_during_refresh(self):
+        """Test a check being refreshed does not hold other requests."""
+        stale = {'ok': True, 'duration_ms': 1.0}
+        health._results['engine'] = (time.monotonic() - 60, stale)
+
+        with health._locks['engine'], \
+                patch('core.engines.FakeEngine.check') as check:
+            res = self.client.get(READYZ_URL)
+
+        check.assert_not_called()
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json()['checks']['engine'], stale)
+        self.assertIn('database', health._results)
+
+    def test_readyz_engine_check_timeout(self):
+        """Test the engine is checked with the health check timeout."""
+        with self.settings(HEALTH_CHECK_ENGINE_TIMEOUT=0.5), \
+                patch('core.engines.FakeEngine.check') as check:
+            self.client.get(READYZ_URL)
+
+        check.assert_called_once_with(timeout=0.5)
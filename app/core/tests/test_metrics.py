@@ -0,0 +1,119 @@
+"""
+Tests for metrics.
+"""
+from prometheus_client import REGISTRY
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core import models
+from core.cache import SegmentCache, get_segment_cache
+from core.engines import EngineError, FakeEngine
+from core.segments import translate_chunk
+
+METRICS_URL = reverse('metrics')
+
+
+def sample(name, **labels):
+    """Return the current value of a metric, or 0."""
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+@override_settings(TRANSLATION_ENGINE={
+    'BACKEND': 'core.engines.FakeEngine',
+    'OPTIONS': {},
+})
+class MetricsTests(TestCase):
+    """Test metrics are recorded and exposed."""
+
+    def setUp(self):
+        get_segment_cache().clear()
+
+    def test_engine_calls_counted(self):
+        """Test engine calls, characters and segments are counted."""
+        labels = {'engine': 'FakeEngine', 'target_lang': 'DE'}
+        calls = sample('translation_engine_calls_total', **labels)
+        characters = sample('translation_engine_characters_total', **labels)
+        segments = sample('translation_document_segments_count',
+                          content_type='html')
+
+        models.Translation.objects.create(
+            user=get_user_model().objects.create_user(
+                'test@example.com', 'testpass123'
+            ),
+            content_type='html',
+            translation_input='<p>Metrics</p><p>Counted</p>',
+        )
+
+        self.assertEqual(
+            sample('translation_engine_calls_total', **labels), calls + 1
+        )
+        self.assertEqual(
+            sample('translation_engine_characters_total', **labels),
+            characters + len('Metrics') + len('Counted'),
+        )
+        self.assertEqual(
+            sample('translation_document_segments_count',
+                   content_type='html'),
+            segments + 1,
+        )
+
+    def test_engine_errors_counted(self):
+        """Test failed engine calls are counted."""
+        labels = {'engine': 'FakeEngine', 'target_lang': 'FR'}
+        errors = sample('translation_engine_errors_total', **labels)
+
+        with self.assertRaises(EngineError):
+            translate_chunk(
+                FakeEngine(error_rate=1.0), ['Hello'], target_lang='FR',
+            )
+
+        self.assertEqual(
+            sample('translation_engine_errors_total', **labels), errors + 1
+        )
+
+    def test_segment_cache_counted(self):
+        """Test segment cache hits, misses and evictions are exported."""
+        def events():
+            return {
+                event: sample(
+                    'translation_segment_cache_events_total', event=event,
+                )
+                for event in ('hits', 'misses', 'evictions')
+            }
+        before = events()
+        cache = SegmentCache(max_entries=1, max_bytes=10000, timeout=60)
+
+        cache.set_many({'a': 'A', 'b': 'B'})
+        cache.get_many(['a', 'b'])
+
+        after = events()
+        self.assertEqual(
+            {event: after[event] - before[event] for event in after},
+            {'hits': 1, 'misses': 1, 'evictions': 1},
+        )
+        self.assertEqual(sample('translation_segment_cache_entries'), 1)
+        self.assertEqual(
+            sample('translation_segment_cache_bytes'), cache.stats()['bytes'],
+        )
+
+    def test_metrics_endpoint(self):
+        """Test the endpoint exposes request metrics."""
+        self.client.get(reverse('api-schema'))
+
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertIn(
+            b'http_request_duration_seconds_count{method="GET",'
+            b'route="api-schema",status="200"}',
+            res.content,
+        )
+
+    @override_settings(METRICS_ALLOWED_IPS=['10.0.0.1'])
+    def test_metrics_endpoint_restricted(self):
+        """Test clients not in METRICS_ALLOWED_IPS are rejected."""
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, 403)
@@ -2,17 +2,35 @@
 Tests for models.
 """
 
-from django.test import TestCase
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
 from django.contrib.auth import get_user_model
 from unittest.mock import patch
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
 import json
 
+import httpx
+from asgiref.sync import async_to_sync
+
 from core import models
+from core.cache import get_segment_cache
+from core.engines import DeepLEngine, EngineError, FakeEngine, get_engine
+
+FAKE_ENGINE = {
+    'BACKEND': 'core.engines.FakeEngine',
+    'OPTIONS': {'template': 'DE {text}'},
+}
 
 
 class ModelTests(TestCase):
     """Test Models."""
 
+    def setUp(self):
+        get_segment_cache().clear()
+
     def test_create_user_with_email_successful(self):
         """Test creating a user with an email is successful."""
         email = "test@example.com"
@@ -62,7 +80,7 @@ class ModelTests(TestCase):
         mocked_translation = 'Hallo, Welt!'
 
         # Mock the translation function
-        with patch('core.models.Translation.translate_to_german',
+        with patch('core.models.Translation.translate_text',
                    return_value=mocked_translation) as mock_translate:
             translation = models.Translation.objects.create(
                 user=user,
@@ -87,3 +105,459 @@ class ModelTests(TestCase):
         # Use the mock_translate variable to perform \
         #    assertions and satisfy linter
         # mock_translate.assert_called_once()
+
+    @override_settings(TRANSLATION_ENGINE=FAKE_ENGINE)
+    def test_translate_html_batches_segments(self):
+        """Test HTML segments are de-duplicated and sent in one call."""
+        engine = get_engine()
+        user = get_user_model().objects.create_user(
+            'test@example.com',
+            'testpass123'
+        )
+        with patch.object(engine, 'translate',
+                          wraps=engine.translate) as mock_translate:
+            translation = models.Translation.objects.create(
+                user=user,
+                content_type='html',
+                translation_input=(
+                    '<h2>Title</h2><p>Text</p><p>Title</p>'
+                    '<script>x()</script>'
+                ),
+            )
+
+        mock_translate.assert_called_once_with(
+            ['Title', 'Text'], target_lang='DE', source_lang=None,
+        )
+        self.assertEqual(
+            translation.translation_result,
+            '<h2>DE Title</h2><p>DE Text</p><p>DE Title</p>'
+            '<script>x()</script>',
+        )
+
+    @override_settings(TRANSLATION_ENGINE=FAKE_ENGINE)
+    def test_translation_memory_reused(self):
+        """Test known segments are served from the translation memory."""
+        engine = get_engine()
+        user = get_user_model().objects.create_user(
+            'test@example.com',
+            'testpass123'
+        )
+        models.Translation.objects.create(
+            user=user,
+            content_type='html',
+            translation_input='<p>Hello</p><p>Footer</p>',
+        )
+        get_segment_cache().clear()
+        with patch.object(engine, 'translate',
+                          wraps=engine.translate) as mock_translate:
+            translation = models.Translation.objects.create(
+                user=user,
+                content_type='html',
+                translation_input='<p> Footer </p><p>World</p>',
+            )
+
+        mock_translate.assert_called_once_with(
+            ['World'], target_lang='DE', source_lang=None,
+        )
+        self.assertEqual(
+            translation.translation_result,
+            '<p> DE Footer </p><p>DE World</p>',
+        )
+        self.assertEqual(models.TranslationMemory.objects.count(), 3)
+
+    @override_settings(TRANSLATION_ENGINE=FAKE_ENGINE)
+    def test_identical_document_reused_across_users(self):
+        """Test an identical document reuses the stored result."""
+        engine = get_engine()
+        html = '<p>Newsletter</p><p>Legal footer</p>'
+        first = models.Translation.objects.create(
+            user=get_user_model().objects.create_user(
+                'one@example.com', 'testpass123'
+            ),
+            content_type='html',
+            translation_input=html,
+        )
+        with patch.object(engine, 'translate') as mock_translate:
+            second = models.Translation.objects.create(
+                user=get_user_model().objects.create_user(
+                    'two@example.com', 'testpass123'
+                ),
+                content_type='html',
+                translation_input=html,
+            )
+
+        mock_translate.assert_not_called()
+        self.assertEqual(second.translation_result, first.translation_result)
+        self.assertEqual(second.content_id, first.content_id)
+        self.assertEqual(models.TranslationContent.objects.count(), 1)
+
+    @override_settings(TRANSLATION_JOB_TIMEOUT=60)
+    def test_claim_pending_reclaims_stale_jobs(self):
+        """Test running jobs without a recent heartbeat are claimed again."""
+        user = get_user_model().objects.create_user(
+            'test@example.com', 'testpass123'
+        )
+        now = timezone.now()
+        stale, alive = models.Translation.objects.bulk_create(
+            models.Translation(
+                user=user, content_type='plain_text',
+                translation_input='Hello', status='running',
+                claimed_at=claimed_at,
+            )
+            for claimed_at in (now - timedelta(minutes=5), now)
+        )
+
+        jobs = models.Translation.objects.claim_pending(10)
+
+        self.assertEqual([job.id for job in jobs], [stale.id])
+        self.assertEqual(jobs[0].status, 'running')
+        self.assertGreaterEqual(jobs[0].claimed_at, now)
+        self.assertEqual(models.Translation.objects.claim_pending(), [])
+
+    @override_settings(TRANSLATION_ENGINE=FAKE_ENGINE)
+    def test_run_job_keeps_input_edited_meanwhile(self):
+        """Test a job does not overwrite an input saved while it ran."""
+        user = get_user_model().objects.create_user(
+            'test@example.com', 'testpass123'
+        )
+        models.Translation.objects.create(
+            user=user, content_type='plain_text',
+            translation_input='old text', status='pending',
+        )
+        job, = models.Translation.objects.claim_pending()
+        edited = models.Translation.objects.get(pk=job.pk)
+        edited.translation_input = 'new text'
+        edited.save()
+
+        job.run_job()
+
+        translation = models.Translation.objects.get(pk=job.pk)
+        self.assertEqual(translation.translation_input, 'new text')
+        self.assertEqual(translation.translation_result, 'DE new text')
+        self.assertEqual(translation.status, 'done')
+
+    @override_settings(TRANSLATION_ENGINE=FAKE_ENGINE)
+    def test_unused_stored_documents_deleted(self):
+        """Test stored documents go once no translation refers to them."""
+        users = [
+            get_user_model().objects.create_user(
+                f'{name}@example.com', 'testpass123'
+            )
+            for name in ('a', 'b')
+        ]
+        first, second = (
+            models.Translation.objects.create(
+                user=user, content_type='html',
+                translation_input='<p>My secret contract</p>',
+            )
+            for user in users
+        )
+        edited = models.Translation.objects.create(
+            user=users[0], content_type='html',
+            translation_input='<p>Draft</p>',
+        )
+        self.assertEqual(models.TranslationContent.objects.count(), 2)
+
+        edited.translation_input = '<p>Final</p>'
+        edited.save()
+        first.delete()
+
+        second.refresh_from_db()
+        self.assertEqual(
+            second.translation_result, '<p>DE My secret contract</p>',
+        )
+        self.assertEqual(
+            sorted(models.TranslationContent.objects.values_list(
+                'translation_input', flat=True,
+            )),
+            ['<p>Final</p>', '<p>My secret contract</p>'],
+        )
+
+        for user in users:
+            user.delete()
+        self.assertFalse(models.TranslationContent.objects.exists())
+
+    @override_settings(TRANSLATION_ENGINE=FAKE_ENGINE)
+    def test_stored_document_text_kept_once(self):
+        """Test rows in the content store leave their text columns blank."""
+        user = get_user_model().objects.create_user(
+            'test@example.com', 'testpass123'
+        )
+        for _ in range(2):
+            models.Translation.objects.create(
+                user=user, content_type='html',
+                translation_input='<p>Shared</p>',
+            )
+
+        rows = models.Translation.objects.values_list(
+            'input_text', 'result_text', 'content_id',
+        )
+        self.assertEqual({row[:2] for row in rows}, {('', '')})
+        translation = models.Translation.objects.with_content().first()
+        self.assertEqual(translation.translation_input, '<p>Shared</p>')
+        self.assertEqual(translation.translation_result, '<p>DE Shared</p>')
+        exported = models.Translation.objects.with_text().values(
+            'translation_input', 'translation_result',
+        )
+        self.assertEqual(
+            list(exported),
+            [{
+                'translation_input': '<p>Shared</p>',
+                'translation_result': '<p>DE Shared</p>',
+            }] * 2,
+        )
+
+    @override_settings(TRANSLATION_ENGINE=FAKE_ENGINE)
+    def test_stored_document_edited(self):
+        """Test editing a row in the content store leaves others alone."""
+        user = get_user_model().objects.create_user(
+            'test@example.com', 'testpass123'
+        )
+        first, second = [
+            models.Translation.objects.create(
+                user=user, content_type='html',
+                translation_input='<p>Shared</p>',
+            )
+            for _ in range(2)
+        ]
+
+        first = models.Translation.objects.get(id=first.id)
+        first.target_lang = 'FR'
+        first.save()
+        first.refresh_from_db()
+        second.refresh_from_db()
+
+        self.assertEqual(first.translation_result, '<p>DE Shared</p>')
+        self.assertEqual(first.translation_input, '<p>Shared</p>')
+        self.assertNotEqual(first.content_id, second.content_id)
+        self.assertEqual(second.translation_result, '<p>DE Shared</p>')
+
+        first.translation_input = ''
+        first.save()
+        first.refresh_from_db()
+
+        self.assertIsNone(first.content_id)
+        self.assertEqual(first.translation_input, '')
+
+    @override_settings(TRANSLATION_ENGINE=FAKE_ENGINE)
+    def test_content_store_keyed_by_content_type(self):
+        """Test the same input of another content type is translated."""
+        user = get_user_model().objects.create_user(
+            'test@example.com', 'testpass123'
+        )
+        for content_type in ('html', 'plain_text'):
+            models.Translation.objects.create(
+                user=user,
+                content_type=content_type,
+                translation_input='<p>Hello</p>',
+            )
+
+        self.assertEqual(models.TranslationContent.objects.count(), 2)
+
+    @override_settings(
+        TRANSLATION_ENGINE=FAKE_ENGINE, TRANSLATION_CONTENT_STORE=False,
+    )
+    def test_content_store_disabled(self):
+        """Test documents are not stored when the store is disabled."""
+        translation = models.Translation.objects.create(
+            user=get_user_model().objects.create_user(
+                'test@example.com', 'testpass123'
+            ),
+            content_type='html',
+            translation_input='<p>Hello</p>',
+        )
+
+        self.assertIsNone(translation.content_id)
+        self.assertFalse(models.TranslationContent.objects.exists())
+
+    @override_settings(TRANSLATION_ENGINE=FAKE_ENGINE)
+    def test_bulk_translate_reuses_documents(self):
+        """Test bulk translation stores documents once and reuses them."""
+        user = get_user_model().objects.create_user(
+            'test@example.com', 'testpass123'
+        )
+
+        def batch():
+            return [
+                models.Translation(
+                    user=user, content_type='html', translation_input=html,
+                )
+                for html in ('<p>A</p>', '<p>B</p>', '<p>A</p>')
+            ]
+
+        models.Translation.objects.bulk_translate(batch())
+        with patch.object(get_engine(), 'translate') as mock_translate:
+            translations = batch()
+            errors = models.Translation.objects.bulk_translate(translations)
+
+        mock_translate.assert_not_called()
+        self.assertEqual(errors, [None, None, None])
+        self.assertEqual(translations[2].translation_result, '<p>DE A</p>')
+        self.assertEqual(models.TranslationContent.objects.count(), 2)
+
+    @override_settings(TRANSLATION_ENGINE=FAKE_ENGINE)
+    def test_save_unchanged_input_not_translated(self):
+        """Test saving without changing the input skips translation."""
+        models.Translation.objects.create(
+            user=get_user_model().objects.create_user(
+                'test@example.com', 'testpass123'
+            ),
+            content_type='html',
+            translation_input='<p>Hello</p>',
+        )
+        translation = models.Translation.objects.get()
+
+        with patch.object(get_engine(), 'translate') as mock_translate:
+            translation.save()
+
+        mock_translate.assert_not_called()
+        self.assertEqual(translation.translation_result, '<p>DE Hello</p>')
+
+    @override_settings(
+        TRANSLATION_ENGINE=FAKE_ENGINE, TRANSLATION_MEMORY=False,
+    )
+    def test_save_changed_input_translates_changed_segments(self):
+        """Test only segments changed since the last save are sent."""
+        paragraphs = [f'Paragraph {i}' for i in range(50)]
+        models.Translation.objects.create(
+            user=get_user_model().objects.create_user(
+                'test@example.com', 'testpass123'
+            ),
+            content_type='html',
+            translation_input=''.join(f'<p>{p}</p>' for p in paragraphs),
+        )
+        get_segment_cache().clear()
+        translation = models.Translation.objects.get()
+        paragraphs[10] = 'Paragraph ten'
+        translation.translation_input = ''.join(
+            f'<p>{p}</p>' for p in paragraphs
+        )
+
+        engine = get_engine()
+        with patch.object(engine, 'translate',
+                          wraps=engine.translate) as mock_translate:
+            translation.save()
+
+        mock_translate.assert_called_once_with(
+            ['Paragraph ten'], target_lang='DE', source_lang=None,
+        )
+        self.assertEqual(
+            translation.translation_result,
+            ''.join(f'<p>DE {p}</p>' for p in paragraphs),
+        )
+
+
+class EngineTests(TestCase):
+    """Test translation engines."""
+
+    def setUp(self):
+        get_segment_cache().clear()
+
+    def test_fake_engine_counts_calls_and_characters(self):
+        """Test the fake engine translates and records its usage."""
+        engine = FakeEngine(template='{target_lang}: {text}')
+
+        result = engine.translate(['Hello', 'World'], target_lang='DE')
+
+        self.assertEqual(result, ['DE: Hello', 'DE: World'])
+        self.assertEqual(engine.calls, 1)
+        self.assertEqual(engine.characters, 10)
+
+    def test_fake_engine_simulates_errors(self):
+        """Test the fake engine fails at the configured error rate."""
+        engine = FakeEngine(error_rate=1.0)
+
+        with self.assertRaises(EngineError):
+            engine.translate(['Hello'], target_lang='DE')
+
+    @override_settings(TRANSLATION_ENGINE={
+        'BACKEND': 'core.engines.FakeEngine',
+        'OPTIONS': {'max_segments': 2},
+    })
+    def test_segments_chunked_to_engine_limits(self):
+        """Test segments are sent in batches the engine accepts."""
+        user = get_user_model().objects.create_user(
+            'test@example.com',
+            'testpass123'
+        )
+
+        translation = models.Translation.objects.create(
+            user=user,
+            content_type='html',
+            translation_input='<p>a</p><p>b</p><p>c</p>',
+        )
+
+        self.assertEqual(get_engine().calls, 2)
+        self.assertEqual(
+            translation.translation_result,
+            '<p>[DE] a</p><p>[DE] b</p><p>[DE] c</p>',
+        )
+
+    def test_deepl_client_created_lazily_once(self):
+        """Test all threads share one DeepL client created on first use."""
+        engine = DeepLEngine(auth_key='key', pool_size=4)
+
+        self.assertIsNone(engine._translator)
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            translators = set(executor.map(
+                lambda _: engine.get_translator(), range(32)
+            ))
+
+        self.assertEqual(len(translators), 1)
+        adapter = translators.pop()._client._session.get_adapter(
+            'https://api.deepl.com'
+        )
+        self.assertEqual(adapter._pool_maxsize, 4)
+
+    def test_deepl_async_client_outlives_event_loops(self):
+        """Test one async client serves calls from several event loops."""
+        engine = DeepLEngine(auth_key='key')
+        requests = []
+
+        def respond(request):
+            requests.append(request)
+            return httpx.Response(200, json={'translations': [
+                {'text': 'Hallo'},
+            ]})
+
+        transport = httpx.MockTransport(respond)
+        with patch('httpx.AsyncClient',
+                   partial(httpx.AsyncClient, transport=transport)):
+            # Every async_to_sync call runs in a new event loop.
+            results = [
+                async_to_sync(engine.atranslate)(['Hello'], target_lang='DE')
+                for _ in range(2)
+            ]
+            client, loop = engine.get_async_client()
+
+        self.assertEqual(results, [['Hallo'], ['Hallo']])
+        self.assertEqual(len(requests), 2)
+        self.assertEqual(requests[0].content, b'text=Hello&target_lang=DE')
+        engine.close()
+        self.assertTrue(client.is_closed)
+        self.assertTrue(loop.is_closed())
+        self.assertIsNone(engine._async_client)
+
+    def test_deepl_check_not_retried(self):
+        """Test the DeepL check sends one request within its timeout."""
+        engine = DeepLEngine(auth_key='key')
+
+        with patch('httpx.get', side_effect=httpx.ConnectTimeout('slow')) \
+                as get:
+            with self.assertRaises(EngineError):
+                engine.check(timeout=2)
+
+        get.assert_called_once()
+        self.assertEqual(get.call_args.kwargs['timeout'], 2)
+        self.assertTrue(get.call_args.args[0].endswith('/v2/usage'))
+
+    def test_engine_closed_on_settings_change(self):
+        """Test the engine's connections are closed when it is replaced."""
+        with self.settings(TRANSLATION_ENGINE={
+            'BACKEND': 'core.engines.DeepLEngine',
+            'OPTIONS': {'auth_key': 'key'},
+        }):
+            engine = get_engine()
+            engine.get_translator()
+
+        self.assertIsNone(engine._translator)
@@ -0,0 +1,101 @@
+"""
+Tests for request profiling.
+"""
+import os
+import tempfile
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.cache import get_segment_cache
+
+TRANSLATIONS_URL = reverse('translation:translation-list')
+PAYLOAD = {
+    'content_type': 'html',
+    'translation_input': '<p>Profile</p><p>me</p>',
+}
+
+
+@override_settings(TRANSLATION_ENGINE={
+    'BACKEND': 'core.engines.FakeEngine',
+    'OPTIONS': {},
+})
+class ProfilingTests(TestCase):
+    """Test Server-Timing headers of profiled requests."""
+
+    def setUp(self):
+        get_segment_cache().clear()
+        self.client = APIClient()
+
+    def authenticate(self, is_staff):
+        user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123', is_staff=is_staff,
+        )
+        token = Token.objects.create(user=user)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + token.key)
+
+    def test_server_timing_for_staff(self):
+        """Test staff users get the timings of all phases."""
+        self.authenticate(is_staff=True)
+
+        res = self.client.post(TRANSLATIONS_URL, PAYLOAD, HTTP_X_PROFILE='1')
+
+        phases = [
+            metric.split(';')[0]
+            for metric in res['Server-Timing'].split(', ')
+        ]
+        for name in ('auth', 'parse', 'engine', 'serialize', 'db', 'total'):
+            self.assertIn(name, phases)
+
+    def test_no_server_timing_for_other_users(self):
+        """Test the timings are not shown to other users."""
+        self.authenticate(is_staff=False)
+
+        res = self.client.post(TRANSLATIONS_URL, PAYLOAD, HTTP_X_PROFILE='1')
+
+        self.assertNotIn('Server-Timing', res)
+
+    def test_no_server_timing_without_header(self):
+        """Test requests are not profiled unless they ask for it."""
+        self.authenticate(is_staff=True)
+
+        res = self.client.post(TRANSLATIONS_URL, PAYLOAD)
+
+        self.assertNotIn('Server-Timing', res)
+
+    def test_cprofile_dump(self):
+        """Test a cProfile dump is written when requested."""
+        self.authenticate(is_staff=True)
+
+        with tempfile.TemporaryDirectory() as directory, \
+                self.settings(PROFILING_DIR=directory):
+            res = self.client.post(
+                TRANSLATIONS_URL, PAYLOAD, HTTP_X_PROFILE='cprofile',
+            )
+
+            self.assertEqual(os.listdir(directory), [res['X-Profile-File']])
+
+    def test_no_cprofile_for_other_users(self):
+        """Test other clients cannot make the server run cProfile."""
+        with tempfile.TemporaryDirectory() as directory, \
+                self.settings(PROFILING_DIR=directory), \
+                patch('cProfile.Profile') as profile:
+            res = self.client.post(
+                TRANSLATIONS_URL, PAYLOAD, HTTP_X_PROFILE='cprofile',
+            )
+            self.assertEqual(res.status_code, 401)
+
+            self.authenticate(is_staff=False)
+            res = self.client.post(
+                TRANSLATIONS_URL, PAYLOAD, HTTP_X_PROFILE='cprofile',
+            )
+            self.assertEqual(res.status_code, 201)
+
+            profile.assert_not_called()
+            self.assertNotIn('X-Profile-File', res)
+            self.assertEqual(os.listdir(directory), [])
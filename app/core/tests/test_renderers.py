@@ -0,0 +1,65 @@
+"""
+Tests for the API renderers and parsers.
+"""
+from decimal import Decimal
+from io import BytesIO
+
+import msgpack
+
+from django.test import SimpleTestCase
+from django.utils.translation import gettext_lazy
+
+from rest_framework.exceptions import ParseError
+
+from core.parsers import MessagePackParser, ORJSONParser
+from core.renderers import MessagePackRenderer, ORJSONRenderer
+
+
+class RendererTests(SimpleTestCase):
+    """Test rendering and parsing API data."""
+
+    def test_orjson_round_trip(self):
+        """Test JSON rendered with orjson parses back to the same data."""
+        data = {'id': 1, 'translation_result': '<p>Grüße</p>', 'tags': []}
+
+        content = ORJSONRenderer().render(data, 'application/json')
+
+        self.assertEqual(content.decode(), '{"id":1,"translation_result":'
+                                           '"<p>Grüße</p>","tags":[]}')
+        self.assertEqual(ORJSONParser().parse(BytesIO(content)), data)
+
+    def test_orjson_encodes_like_drf(self):
+        """Test types orjson does not know are encoded like DRF does."""
+        content = ORJSONRenderer().render(
+            {'price': Decimal('1.5'), 'label': gettext_lazy('Done'), 1: 2},
+            'application/json',
+        )
+
+        self.assertEqual(content, b'{"price":1.5,"label":"Done","1":2}')
+
+    def test_orjson_indent(self):
+        """Test the response is indented when the client asks for it."""
+        content = ORJSONRenderer().render(
+            {'id': 1}, 'application/json; indent=4'
+        )
+
+        self.assertEqual(content, b'{\n  "id": 1\n}')
+
+    def test_orjson_parse_error(self):
+        """Test malformed JSON raises a parse error."""
+        with self.assertRaises(ParseError):
+            ORJSONParser().parse(BytesIO(b'{"id":'))
+
+    def test_msgpack_round_trip(self):
+        """Test MessagePack output parses back to the same data."""
+        data = {'id': 1, 'translation_result': '<p>Grüße</p>', 'tags': []}
+
+        content = MessagePackRenderer().render(data)
+
+        self.assertEqual(msgpack.unpackb(content), data)
+        self.assertEqual(MessagePackParser().parse(BytesIO(content)), data)
+
+    def test_msgpack_parse_error(self):
+        """Test malformed MessagePack raises a parse error."""
+        with self.assertRaises(ParseError):
+            MessagePackParser().parse(BytesIO(b'\x81\xa1'))
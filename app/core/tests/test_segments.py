@@ -0,0 +1,129 @@
+"""
+Tests for segment batching helpers.
+"""
+import time
+
+from asgiref.sync import async_to_sync
+
+from django.test import SimpleTestCase, override_settings
+
+from core import segments
+from core.cache import get_segment_cache
+from core.engines import EngineError, FakeEngine
+
+
+class SegmentTests(SimpleTestCase):
+    """Test segment helpers."""
+
+    def test_chunk_segments_by_count(self):
+        """Test chunks never hold more than the maximum of segments."""
+        chunks = list(segments.chunk_segments(
+            [str(i) for i in range(120)], max_segments=50,
+        ))
+
+        self.assertEqual([len(chunk) for chunk in chunks], [50, 50, 20])
+
+    def test_chunk_segments_by_size(self):
+        """Test chunks stay below the request size limit."""
+        text = 'ü' * 1000
+        chunks = list(segments.chunk_segments(
+            [text] * 10,
+            max_bytes=segments.REQUEST_OVERHEAD_BYTES + 20000,
+        ))
+
+        self.assertEqual([len(chunk) for chunk in chunks], [3, 3, 3, 1])
+
+    def test_unique_segments(self):
+        """Test duplicate and blank segments are dropped in order."""
+        result = segments.unique_segments(['b', 'a', ' ', 'b', 'c', 'a'])
+
+        self.assertEqual(result, ['b', 'a', 'c'])
+
+    def test_segment_key_normalizes_whitespace(self):
+        """Test segment keys ignore whitespace but not the language."""
+        key = segments.segment_key('Hello  world', 'DE', 'html')
+
+        self.assertEqual(
+            key, segments.segment_key(' Hello\nworld ', 'de', 'html'),
+        )
+        self.assertNotEqual(
+            key, segments.segment_key('Hello world', 'FR', 'html'),
+        )
+
+
+@override_settings(TRANSLATION_MEMORY=False)
+class AsyncTranslateSegmentsTests(SimpleTestCase):
+    """Test translating segments on the async path."""
+
+    def setUp(self):
+        get_segment_cache().clear()
+
+    @override_settings(TRANSLATION_ASYNC_CONCURRENCY=4)
+    def test_chunks_translated_concurrently(self):
+        """Test chunks are sent to the engine concurrently, in order."""
+        engine = FakeEngine(latency=0.1, max_segments=1)
+        texts = [f'text {i}' for i in range(8)]
+
+        start = time.perf_counter()
+        result = async_to_sync(segments.atranslate_segments)(
+            texts, engine, target_lang='DE', content_type='html',
+        )
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(result, [f'[DE] {text}' for text in texts])
+        self.assertEqual(engine.calls, 8)
+        self.assertLess(elapsed, 0.5)
+
+
+@override_settings(TRANSLATION_MEMORY=False)
+class ThreadPoolTranslateSegmentsTests(SimpleTestCase):
+    """Test translating segments in a thread pool."""
+
+    def setUp(self):
+        get_segment_cache().clear()
+
+    @override_settings(TRANSLATION_THREAD_POOL_SIZE=4)
+    def test_chunks_translated_concurrently(self):
+        """Test chunks are translated concurrently and kept in order."""
+        engine = FakeEngine(latency=0.1, max_segments=1)
+        texts = [f'text {i}' for i in range(8)]
+
+        start = time.perf_counter()
+        result = segments.translate_segments(
+            texts, engine, target_lang='DE', content_type='html',
+        )
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(result, [f'[DE] {text}' for text in texts])
+        self.assertLess(elapsed, 0.5)
+
+    @override_settings(TRANSLATION_THREAD_POOL_SIZE=2)
+    def test_outstanding_chunks_cancelled_on_error(self):
+        """Test chunks are not sent anymore once one has failed."""
+        engine = FakeEngine(latency=0.05, max_segments=1, error_rate=1.0)
+
+        with self.assertRaises(EngineError):
+            segments.translate_segments(
+                [f'text {i}' for i in range(20)], engine,
+                target_lang='DE', content_type='html',
+            )
+
+        self.assertLess(engine.calls, 20)
+
+    @override_settings(TRANSLATION_THREAD_POOL_SIZE=4)
+    def test_languages_translated_concurrently(self):
+        """Test the requests of all target languages run concurrently."""
+        engine = FakeEngine(latency=0.1)
+        texts = ['Hello', 'World', 'Hello']
+
+        start = time.perf_counter()
+        result = segments.translate_segments_multi(
+            texts, engine,
+            target_langs=['DE', 'FR', 'ES', 'IT'], content_type='html',
+        )
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(result['FR'], ['[FR] Hello', '[FR] World',
+                                        '[FR] Hello'])
+        self.assertEqual(engine.calls, 4)
+        self.assertLess(elapsed, 0.3)
@@ -0,0 +1,42 @@
+"""
+Views for the core app.
+"""
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
+
+from core.health import run_check
+from core.metrics import render_metrics
+
+
+def metrics(request):
+    """Return the Prometheus metrics of all worker processes.
+
+    Only clients in METRICS_ALLOWED_IPS may read them; '*' allows all.
+    """
+    allowed = getattr(settings, 'METRICS_ALLOWED_IPS', ['127.0.0.1', '::1'])
+    if '*' not in allowed and request.META.get('REMOTE_ADDR') not in allowed:
+        return HttpResponseForbidden()
+
+    content, content_type = render_metrics()
+
+    return HttpResponse(content, content_type=content_type)
+
+
+def healthz(request):
+    """Liveness probe: the process serves requests.
+
+    Dependencies are not checked, so an outage of the database or the
+    engine does not get healthy processes restarted.
+    """
+    return JsonResponse({'status': 'ok'})
+
+
+def readyz(request):
+    """Readiness probe: the database and the engine are reachable."""
+    checks = {name: run_check(name) for name in ('database', 'engine')}
+    ready = all(check['ok'] for check in checks.values())
+
+    return JsonResponse(
+        {'status': 'ok' if ready else 'unavailable', 'checks': checks},
+        status=200 if ready else 503,
+    )
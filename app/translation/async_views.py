@@ -0,0 +1,102 @@
+"""
+Async views for the translation APIs.
+
+Served natively under ASGI, so a request waiting for the translation
+engine does not occupy a thread.
+"""
+import orjson
+from asgiref.sync import sync_to_async
+
+from django.http import HttpResponse
+
+from rest_framework.authtoken.models import Token
+
+from core import profiling
+from core.engines import EngineError
+from core.models import Translation
+from core.profiling import phase
+from core.renderers import dumps
+from translation.serializers import TranslationSerializer
+
+
+@sync_to_async
+def authenticate(request):
+    """Return the active user of the request's auth token, if any."""
+    header = request.META.get('HTTP_AUTHORIZATION', '').split()
+    if len(header) != 2 or header[0] != 'Token':
+        return None
+    try:
+        token = Token.objects.select_related('user').get(key=header[1])
+    except Token.DoesNotExist:
+        return None
+
+    return token.user if token.user.is_active else None
+
+
+def json_response(data, status=200):
+    """Return data as a JSON response, encoded with orjson."""
+    return HttpResponse(
+        dumps(data), status=status, content_type='application/json',
+    )
+
+
+def error(detail, status):
+    return json_response({'detail': detail}, status=status)
+
+
+async def translation_list(request):
+    """Create a translation."""
+    if request.method != 'POST':
+        return error(f'Method "{request.method}" not allowed.', 405)
+    with phase('auth'):
+        user = await authenticate(request)
+    if user is None:
+        return error('Invalid or missing token.', 401)
+    request.user = user
+    profiling.authenticated(user)
+
+    if request.content_type == 'application/json':
+        try:
+            data = orjson.loads(request.body)
+        except ValueError:
+            return error('Malformed JSON.', 400)
+    else:
+        data = request.POST
+
+    serializer = TranslationSerializer(data=data)
+    if not serializer.is_valid():
+        return json_response(serializer.errors, status=400)
+
+    translation = Translation(user=user, **serializer.validated_data)
+    try:
+        await translation.atranslate_input()
+    except EngineError as exc:
+        return error(str(exc), 502)
+    await sync_to_async(translation.save)(translate=False)
+
+    return json_response(TranslationSerializer(translation).data, status=201)
+
+
+async def translation_detail(request, pk):
+    """Retrieve a translation."""
+    if request.method != 'GET':
+        return error(f'Method "{request.method}" not allowed.', 405)
+    with phase('auth'):
+        user = await authenticate(request)
+    if user is None:
+        return error('Invalid or missing token.', 401)
+    request.user = user
+    profiling.authenticated(user)
+
+    translation = await sync_to_async(
+        Translation.objects.with_content().filter(user=user, pk=pk).first
+    )()
+    if translation is None:
+        return error('Not found.', 404)
+
+    return json_response(TranslationSerializer(translation).data)
+
+
+# Authentication is by token, not session.
+translation_list.csrf_exempt = True
+translation_detail.csrf_exempt = True
@@ -0,0 +1,12 @@
+"""
+Pagination for translation APIs.
+"""
+from rest_framework.pagination import CursorPagination
+
+
+class TranslationCursorPagination(CursorPagination):
+    """Keyset pagination on the translation id, newest first."""
+    ordering = '-id'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
@@ -1,28 +1,82 @@
 """
 Serializers for translation APIs
 """
+from django.conf import settings
+
 from rest_framework import serializers
 
 from core.models import (
     Translation
 )
+from core.profiling import phase
 
 # from bs4 import BeautifulSoup
 
 
 class TranslationSerializer(serializers.ModelSerializer):
-    """Serializer for translations."""
+    """Serializer for translations.
+
+    Pass `fields` to only serialize a subset of the fields.
+    """
+    translation_input = serializers.CharField(
+        allow_blank=True, required=False,
+        style={'base_template': 'textarea.html'},
+    )
+    translation_result = serializers.CharField(read_only=True)
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
 
     class Meta:
         model = Translation
         fields = [
-            'id', 'content_type', 'translation_input',
-            'translation_elements', 'translation_result',
+            'id', 'content_type', 'target_lang', 'translation_input',
+            'translation_elements', 'translation_result', 'status', 'error',
+            'created_at', 'updated_at',
+        ]
+        read_only_fields = [
+            'id', 'translation_elements', 'translation_result',
+            'status', 'error', 'created_at', 'updated_at',
         ]
-        read_only_fields = ['id', 'translation_elements', 'translation_result']
+
+    def to_representation(self, instance):
+        with phase('serialize'):
+            return super().to_representation(instance)
+
+    def validate_target_lang(self, value):
+        """Return the language code in upper case."""
+        return value.upper()
 
     def create(self, validated_data):
         """Create a translation."""
         translation = Translation.objects.create(**validated_data)
 
         return translation
+
+
+class TranslationMultiSerializer(TranslationSerializer):
+    """Serializer for translating one input into several languages."""
+    target_langs = serializers.ListField(
+        child=serializers.CharField(max_length=10),
+        min_length=1,
+        max_length=getattr(settings, 'TRANSLATION_MAX_TARGET_LANGS', 10),
+    )
+
+    class Meta(TranslationSerializer.Meta):
+        fields = ['content_type', 'translation_input', 'target_langs']
+
+    def validate_target_langs(self, value):
+        """Return the language codes in upper case."""
+        return [target_lang.upper() for target_lang in value]
+
+
+class TranslationStatusSerializer(serializers.ModelSerializer):
+    """Serializer for the status of a translation job."""
+
+    class Meta:
+        model = Translation
+        fields = ['id', 'status', 'error']
+        read_only_fields = fields
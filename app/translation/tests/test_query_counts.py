@@ -0,0 +1,162 @@
+"""
+Tests for the number of SQL queries of the translation APIs.
+"""
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.cache import get_segment_cache
+from core.models import Translation
+
+TRANSLATIONS_URL = reverse('translation:translation-list')
+DATA_SIZES = [1, 10, 100]
+
+
+def detail_url(translation_id):
+    """Return the detail URL of a translation."""
+    return reverse('translation:translation-detail', args=[translation_id])
+
+
+def create_translations(user, count):
+    """Create translations without translating them."""
+    return Translation.objects.bulk_create(
+        Translation(
+            user=user,
+            content_type='html',
+            translation_input=f'<p>Input {i}</p>',
+            translation_result=f'<p>Result {i}</p>',
+        )
+        for i in range(count)
+    )
+
+
+@override_settings(TRANSLATION_ENGINE={
+    'BACKEND': 'core.engines.FakeEngine',
+    'OPTIONS': {},
+})
+class TranslationQueryCountTests(TestCase):
+    """Test the API runs a fixed number of queries at any data size."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass123',
+        )
+        token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + token.key)
+        get_segment_cache().clear()
+
+    def test_list_query_count(self):
+        """Test listing takes a token lookup and one page query."""
+        created = 0
+        for size in DATA_SIZES:
+            create_translations(self.user, size - created)
+            created = size
+
+            with self.assertNumQueries(2):
+                res = self.client.get(TRANSLATIONS_URL)
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(res.data['results']), min(size, 50))
+
+    def test_retrieve_query_count(self):
+        """Test retrieving takes a token lookup and one row query."""
+        for size in DATA_SIZES:
+            translation = create_translations(self.user, size)[-1]
+
+            with self.assertNumQueries(2):
+                res = self.client.get(detail_url(translation.id))
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_create_query_count(self):
+        """Test creating reads and writes the memory once per document."""
+        for size in DATA_SIZES:
+            payload = {
+                'content_type': 'html',
+                'translation_input': ''.join(
+                    f'<p>Segment {size} {i}</p>' for i in range(size)
+                ),
+            }
+
+            # Token, content lookup, memory lookup, memory insert, content
+            # insert and translation insert.
+            with self.assertNumQueries(6):
+                res = self.client.post(TRANSLATIONS_URL, payload)
+
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_create_cached_segments_query_count(self):
+        """Test segments in the in-process cache skip the memory."""
+        self.client.post(TRANSLATIONS_URL, {
+            'content_type': 'html',
+            'translation_input': '<p>Hello</p><p>World</p>',
+        })
+
+        # Token, content lookup, content insert and translation insert.
+        with self.assertNumQueries(4):
+            self.client.post(TRANSLATIONS_URL, {
+                'content_type': 'html',
+                'translation_input': '<div>Hello</div><div>World</div>',
+            })
+
+    def test_create_duplicate_document_query_count(self):
+        """Test a known document skips segmenting and the memory."""
+        payload = {
+            'content_type': 'html',
+            'translation_input': '<p>Hello</p><p>World</p>',
+        }
+        self.client.post(TRANSLATIONS_URL, payload)
+
+        # Token, content lookup and translation insert.
+        with self.assertNumQueries(3):
+            self.client.post(TRANSLATIONS_URL, payload)
+
+    def test_list_projection_skips_text_columns(self):
+        """Test the projected list query does not load text columns."""
+        create_translations(self.user, 3)
+
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(TRANSLATIONS_URL, {'fields': 'id,status'})
+
+        sql = context.captured_queries[-1]['sql']
+        self.assertNotIn('translation_input', sql)
+        self.assertNotIn('translation_result', sql)
+
+    def test_conditional_list_not_modified(self):
+        """Test a current list is answered with 304 from versions only."""
+        create_translations(self.user, 10)
+        etag = self.client.get(TRANSLATIONS_URL)['ETag']
+
+        with CaptureQueriesContext(connection) as context:
+            res = self.client.get(TRANSLATIONS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+        self.assertEqual(len(context.captured_queries), 2)
+        sql = context.captured_queries[-1]['sql']
+        self.assertNotIn('translation_input', sql)
+        self.assertNotIn('translation_result', sql)
+
+    def test_conditional_retrieve_not_modified(self):
+        """Test a current translation is answered with 304 cheaply."""
+        translation = create_translations(self.user, 1)[0]
+        res = self.client.get(detail_url(translation.id))
+
+        with CaptureQueriesContext(connection) as context:
+            res = self.client.get(
+                detail_url(translation.id), HTTP_IF_NONE_MATCH=res['ETag'],
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(len(context.captured_queries), 2)
+        self.assertNotIn(
+            'translation_input', context.captured_queries[-1]['sql']
+        )
@@ -2,7 +2,8 @@
 Tests for translation APIs.
 """
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.management import call_command
+from django.test import TestCase, override_settings
 from django.urls import reverse
 
 from unittest.mock import patch
@@ -11,10 +12,18 @@ from rest_framework import status
 from rest_framework.test import APIClient
 from rest_framework.authtoken.models import Token
 
+from core.documents import parse_document
+from core.engines import EngineError
 from core.models import Translation
 
 from bs4 import BeautifulSoup
 
+import csv
+import gzip
+import io
+import json
+import msgpack
+
 def normalize_html(html_string):
     """Normalize HTML string using Beautiful Soup."""
     soup = BeautifulSoup(html_string, 'html.parser')
@@ -27,6 +36,7 @@ def normalize_html(html_string):
 # import json
 
 TRANSLATIONS_URL = reverse('translation:translation-list')
+ASYNC_TRANSLATIONS_URL = reverse('translation:async-translation-list')
 
 
 def create_sample_translation(user, **params):
@@ -166,6 +176,444 @@ class TranslationApiTests(TestCase):
         # Check that the returned mocked translation matches the expected output.
         self.assertEqual(res.data['translation_result'], expected_output)
 
+    def test_create_translation_async(self):
+        """Test queueing a translation job and processing it."""
+        payload = {
+            'content_type': 'plain_text',
+            'translation_input': 'Hello',
+        }
+
+        with patch.object(Translation, 'translate_text',
+                          return_value='Hallo') as mock_translate:
+            res = self.client.post(f'{TRANSLATIONS_URL}?async=1', payload)
+
+            self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+            self.assertEqual(res.data['status'], 'pending')
+            mock_translate.assert_not_called()
+
+            call_command('translation_worker', '--once')
+
+        status_url = f'{TRANSLATIONS_URL}{res.data["id"]}/status/'
+        res = self.client.get(status_url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['status'], 'done')
+        translation = Translation.objects.get(id=res.data['id'])
+        self.assertEqual(translation.translation_result, 'Hallo')
+
+    def test_translation_job_failure_recorded(self):
+        """Test a failing translation job is marked as failed."""
+        translation = Translation.objects.create(
+            user=self.user,
+            content_type='plain_text',
+            translation_input='Hello',
+            status='pending',
+        )
+
+        with patch.object(Translation, 'translate_text',
+                          side_effect=ValueError('engine down')):
+            call_command('translation_worker', '--once')
+
+        translation.refresh_from_db()
+        self.assertEqual(translation.status, 'failed')
+        self.assertEqual(translation.error, 'engine down')
+
+    def test_bulk_create_translations(self):
+        """Test creating several translations with shared segments."""
+        payload = [
+            {'content_type': 'html',
+             'translation_input': '<p>Hello</p><p>Footer</p>'},
+            {'content_type': 'unknown', 'translation_input': 'Hello'},
+            {'content_type': 'html',
+             'translation_input': '<p>World</p><p>Footer</p>'},
+        ]
+
+        with patch.object(Translation, 'translate_text',
+                          side_effect=lambda texts: [
+                              f'DE {text}' for text in texts
+                          ]) as mock_translate:
+            res = self.client.post(
+                f'{TRANSLATIONS_URL}bulk/', payload, format='json',
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+        mock_translate.assert_called_once_with(['Hello', 'Footer', 'World'])
+        results = res.data['results']
+        self.assertIn('content_type', results[1]['errors'])
+        translation = Translation.objects.get(id=results[2]['id'])
+        self.assertEqual(translation.translation_result,
+                         '<p>DE World</p><p>DE Footer</p>')
+        self.assertEqual(Translation.objects.count(), 2)
+
+    def test_bulk_create_one_document_fails(self):
+        """Test a document the engine rejects does not fail the others."""
+        payload = [
+            {'content_type': 'html', 'translation_input': '<p>good one</p>'},
+            {'content_type': 'html', 'translation_input': '<p>BAD</p>'},
+        ]
+
+        def translate(texts):
+            if 'BAD' in texts:
+                raise EngineError('rejected')
+            return [f'DE {text}' for text in texts]
+
+        with patch.object(Translation, 'translate_text',
+                          side_effect=translate):
+            res = self.client.post(
+                f'{TRANSLATIONS_URL}bulk/', payload, format='json',
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+        good, bad = res.data['results']
+        self.assertEqual(
+            Translation.objects.get(id=good['id']).translation_result,
+            '<p>DE good one</p>',
+        )
+        self.assertIn('rejected', str(bad['errors']))
+        self.assertEqual(Translation.objects.count(), 1)
+
+    def test_create_translation_flags(self):
+        """Test the async and stream flags accept true/false and 1/0."""
+        payload = {
+            'content_type': 'plain_text',
+            'translation_input': 'Hello',
+        }
+
+        res = self.client.post(f'{TRANSLATIONS_URL}?async=true', payload)
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+
+        for query in ('async=maybe', 'stream=yes', 'stream=2'):
+            res = self.client.post(f'{TRANSLATIONS_URL}?{query}', payload)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(query.split('=')[0], res.data)
+        self.assertEqual(Translation.objects.count(), 1)
+
+    def test_create_translation_stream(self):
+        """Test streaming translated segments as NDJSON."""
+        payload = {
+            'content_type': 'html',
+            'translation_input': '<h1>Title</h1><p>Text</p><p>Title</p>',
+        }
+
+        with patch.object(Translation, 'translate_text',
+                          side_effect=lambda texts: [
+                              f'DE {text}' for text in texts
+                          ]):
+            res = self.client.post(f'{TRANSLATIONS_URL}?stream=1', payload)
+            records = [
+                json.loads(line)
+                for line in b''.join(res.streaming_content).splitlines()
+            ]
+
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(records[:3], [
+            {'segment': 0, 'translation': 'DE Title'},
+            {'segment': 1, 'translation': 'DE Text'},
+            {'segment': 2, 'translation': 'DE Title'},
+        ])
+        data = records[-1]['translation']
+        translation = Translation.objects.get(id=data['id'])
+        self.assertEqual(
+            translation.translation_result,
+            '<h1>DE Title</h1><p>DE Text</p><p>DE Title</p>',
+        )
+
+    @override_settings(TRANSLATION_ENGINE={
+        'BACKEND': 'core.engines.FakeEngine',
+        'OPTIONS': {'template': 'DE {text}'},
+    })
+    def test_create_and_retrieve_translation_async_view(self):
+        """Test the async views create and retrieve translations."""
+        payload = {
+            'content_type': 'html',
+            'translation_input': '<p>Hello</p><p>World</p>',
+        }
+
+        res = self.client.post(ASYNC_TRANSLATIONS_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.json()['translation_result'],
+                         '<p>DE Hello</p><p>DE World</p>')
+
+        url = reverse(
+            'translation:async-translation-detail', args=[res.json()['id']]
+        )
+        res = self.client.get(url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json()['status'], 'done')
+
+    @override_settings(TRANSLATION_ENGINE={
+        'BACKEND': 'core.engines.FakeEngine',
+        'OPTIONS': {'template': 'DE {text}'},
+    })
+    def test_partial_update_translates_changed_segments(self):
+        """Test updating the input only translates changed segments."""
+        translation = Translation.objects.create(
+            user=self.user,
+            content_type='html',
+            translation_input='<p>Hello</p><p>Wrold</p>',
+        )
+        url = reverse('translation:translation-detail', args=[translation.id])
+
+        with patch.object(Translation, 'translate_text',
+                          side_effect=lambda texts: [
+                              f'DE {text}' for text in texts
+                          ]) as mock_translate:
+            res = self.client.patch(
+                url, {'translation_input': '<p>Hello</p><p>World</p>'},
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        mock_translate.assert_called_once_with(['World'])
+        self.assertEqual(res.data['translation_result'],
+                         '<p>DE Hello</p><p>DE World</p>')
+
+    @override_settings(TRANSLATION_ENGINE={
+        'BACKEND': 'core.engines.FakeEngine',
+        'OPTIONS': {},
+    })
+    def test_create_translation_multiple_languages(self):
+        """Test one input is translated into several languages."""
+        payload = {
+            'content_type': 'html',
+            'translation_input': '<p>Good morning</p>',
+            'target_langs': ['de', 'fr'],
+        }
+
+        with patch('core.models.parse_document',
+                   wraps=parse_document) as mock_parse:
+            res = self.client.post(
+                f'{TRANSLATIONS_URL}multi/', payload, format='json',
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        mock_parse.assert_called_once()
+        self.assertEqual(
+            [
+                (item['target_lang'], item['translation_result'])
+                for item in res.data['results']
+            ],
+            [
+                ('DE', '<p>[DE] Good morning</p>'),
+                ('FR', '<p>[FR] Good morning</p>'),
+            ],
+        )
+        self.assertEqual(
+            Translation.objects.filter(user=self.user).count(), 2
+        )
+
+    def test_msgpack_content_negotiation(self):
+        """Test MessagePack requests and responses."""
+        payload = msgpack.packb({
+            'content_type': 'plain_text',
+            'translation_input': 'Hello',
+        })
+
+        with patch.object(Translation, 'translate_text',
+                          return_value='Hallo'):
+            res = self.client.post(
+                TRANSLATIONS_URL, payload,
+                content_type='application/msgpack',
+                HTTP_ACCEPT='application/msgpack',
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res['Content-Type'], 'application/msgpack')
+        self.assertEqual(
+            msgpack.unpackb(res.content)['translation_result'], 'Hallo'
+        )
+
+    def test_retrieve_translation_etag(self):
+        """Test the ETag changes when the translation is updated."""
+        with patch.object(Translation, 'translate_input'):
+            translation = create_sample_translation(self.user)
+        url = reverse('translation:translation-detail', args=[translation.id])
+
+        res = self.client.get(url)
+        etag = res['ETag']
+
+        self.assertTrue(etag.startswith('"'))
+        self.assertIn('Last-Modified', res)
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code,
+            status.HTTP_304_NOT_MODIFIED,
+        )
+        self.assertNotEqual(
+            self.client.get(url, {'fields': 'id'})['ETag'], etag,
+        )
+
+        translation.status = 'failed'
+        translation.save(translate=False)
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+
+    def test_list_translations_etag_changes_on_delete(self):
+        """Test the list ETag changes when a listed row is deleted."""
+        with patch.object(Translation, 'translate_input'):
+            translations = [
+                create_sample_translation(self.user) for _ in range(2)
+            ]
+        etag = self.client.get(TRANSLATIONS_URL)['ETag']
+
+        translations[0].delete()
+        res = self.client.get(TRANSLATIONS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_list_translations_ignores_if_modified_since(self):
+        """Test deleting the newest row is not answered with a 304."""
+        with patch.object(Translation, 'translate_input'):
+            translations = [
+                create_sample_translation(self.user) for _ in range(2)
+            ]
+        last_modified = self.client.get(TRANSLATIONS_URL)['Last-Modified']
+
+        translations[1].delete()
+        res = self.client.get(
+            TRANSLATIONS_URL, HTTP_IF_MODIFIED_SINCE=last_modified,
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_retrieve_translation_changed_within_a_second(self):
+        """Test a change in the same second as the last fetch is seen."""
+        with patch.object(Translation, 'translate_input'):
+            translation = create_sample_translation(self.user)
+        url = reverse('translation:translation-detail', args=[translation.id])
+        res = self.client.get(url)
+
+        translation.status = 'failed'
+        translation.save(translate=False)
+        res = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=res['Last-Modified'],
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['status'], 'failed')
+
+    def test_export_translations_ndjson(self):
+        """Test exporting the user's translations as NDJSON."""
+        with patch.object(Translation, 'translate_input'):
+            translations = [
+                create_sample_translation(self.user) for _ in range(3)
+            ]
+            other_user = get_user_model().objects.create_user(
+                'other@example.com', 'testpass123',
+            )
+            create_sample_translation(other_user)
+
+        res = self.client.get(f'{TRANSLATIONS_URL}export/')
+        rows = [
+            json.loads(line)
+            for line in b''.join(res.streaming_content).splitlines()
+        ]
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(
+            [row['id'] for row in rows],
+            [translation.id for translation in translations],
+        )
+
+    def test_export_translations_csv_gzip(self):
+        """Test exporting gzip-compressed CSV."""
+        with patch.object(Translation, 'translate_input'):
+            create_sample_translation(self.user, translation_result='Hallo')
+
+        res = self.client.get(
+            f'{TRANSLATIONS_URL}export/',
+            {'file_format': 'csv', 'compress': 'gzip'},
+        )
+        content = gzip.decompress(b''.join(res.streaming_content))
+        rows = list(csv.DictReader(io.StringIO(content.decode())))
+
+        self.assertEqual(res['Content-Type'], 'application/gzip')
+        self.assertIn('translations.csv.gz', res['Content-Disposition'])
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['translation_result'], 'Hallo')
+
+    def test_export_translations_accept_headers(self):
+        """Test the export negotiates the media types it returns."""
+        with patch.object(Translation, 'translate_input'):
+            create_sample_translation(self.user, translation_result='Hallo')
+
+        for accept, query, content_type in (
+            ('application/x-ndjson', {}, 'application/x-ndjson'),
+            ('text/csv', {}, 'text/csv'),
+            ('text/csv', {'file_format': 'csv'}, 'text/csv'),
+            ('application/gzip', {'file_format': 'csv'}, 'application/gzip'),
+        ):
+            res = self.client.get(
+                f'{TRANSLATIONS_URL}export/', query, HTTP_ACCEPT=accept,
+            )
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(res['Content-Type'], content_type)
+            content = b''.join(res.streaming_content)
+            if content_type == 'application/gzip':
+                content = gzip.decompress(content)
+            self.assertIn(b'Hallo', content)
+
+        res = self.client.get(
+            f'{TRANSLATIONS_URL}export/', {'file_format': 'xml'},
+            HTTP_ACCEPT='text/csv',
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn(b'file_format', res.content)
+
+    def test_async_view_requires_token(self):
+        """Test the async views reject requests without a valid token."""
+        self.client.credentials(HTTP_AUTHORIZATION='Token invalid')
+
+        res = self.client.post(ASYNC_TRANSLATIONS_URL, {}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_list_translations_paginated(self):
+        """Test translations are listed newest first by cursor."""
+        with patch.object(Translation, 'translate_input'):
+            translations = [
+                create_sample_translation(self.user) for _ in range(3)
+            ]
+            other_user = get_user_model().objects.create_user(
+                'other@example.com', 'testpass123',
+            )
+            create_sample_translation(other_user)
+
+        res = self.client.get(TRANSLATIONS_URL, {'page_size': 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item['id'] for item in res.data['results']],
+            [translations[2].id, translations[1].id],
+        )
+        res = self.client.get(res.data['next'])
+        self.assertEqual(
+            [item['id'] for item in res.data['results']],
+            [translations[0].id],
+        )
+        self.assertIsNone(res.data['next'])
+
+    def test_list_translations_field_projection(self):
+        """Test only the requested fields are returned."""
+        with patch.object(Translation, 'translate_input'):
+            create_sample_translation(self.user)
+
+        res = self.client.get(TRANSLATIONS_URL, {'fields': 'id,status'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(res.data['results'][0]), {'id', 'status'})
+
+        res = self.client.get(TRANSLATIONS_URL, {'fields': 'id,user'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_actual_translation_html_simple(self):
         """Test actual translation from English
         to German for input containing HTML."""
@@ -188,7 +636,9 @@ class TranslationApiTests(TestCase):
 
         # Check that the simple returned translation matches the expected output.
         # print(res.data['translation_result'])
-        self.assertEqual(res.data['translation_result'], expected_output_simple.replace("'", "\""))
+        # Untouched markup is kept byte-identical.
+        self.assertEqual(res.data['translation_result'],
+                         expected_output_simple)
 
     def test_actual_translation_html_nested(self):
             """Test actual translation from English
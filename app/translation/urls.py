@@ -8,7 +8,7 @@ from django.urls import (
 
 from rest_framework.routers import DefaultRouter
 
-from translation import views
+from translation import async_views, views
 
 
 router = DefaultRouter()
@@ -17,5 +17,15 @@ router.register('translation', views.TranslationViewSet)
 app_name = 'translation'
 
 urlpatterns = [
+    path(
+        'async/translation/',
+        async_views.translation_list,
+        name='async-translation-list',
+    ),
+    path(
+        'async/translation/<int:pk>/',
+        async_views.translation_detail,
+        name='async-translation-detail',
+    ),
     path('', include(router.urls)),
 ]
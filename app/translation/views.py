@@ -1,6 +1,16 @@
 """
 Views for the translation APIs
 """
+import hashlib
+import json
+import math
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
 from drf_spectacular.utils import (
     extend_schema_view,
     extend_schema,
@@ -13,31 +23,222 @@ from rest_framework import (
     mixins,
     status,
 )
-# from rest_framework.decorators import action
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 
+from core import export, profiling
 from core.models import (
-    Translation
+    STATUS_PENDING,
+    Translation,
+)
+from core.profiling import phase
+from core.renderers import (
+    CSVFileRenderer,
+    GzipFileRenderer,
+    NDJSONFileRenderer,
+    ORJSONRenderer,
 )
 from translation import serializers
+from translation.pagination import TranslationCursorPagination
+
+
+FLAG_VALUES = {'1': True, 'true': True, '0': False, 'false': False}
+
+
+def query_flag(request, name):
+    """Return a boolean query parameter; 1, 0, true and false are valid."""
+    value = request.query_params.get(name, '0').lower()
+    if value not in FLAG_VALUES:
+        raise ValidationError({name: 'Expected 1, 0, true or false.'})
+
+    return FLAG_VALUES[value]
+
+
+FIELDS_PARAMETER = OpenApiParameter(
+    'fields',
+    OpenApiTypes.STR,
+    description='Comma-separated list of fields to return. Large text '
+                'fields that are not requested are not loaded.',
+)
 
 
+@extend_schema_view(
+    list=extend_schema(parameters=[FIELDS_PARAMETER]),
+    retrieve=extend_schema(parameters=[FIELDS_PARAMETER]),
+    create=extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'async',
+                OpenApiTypes.INT, enum=[0, 1],
+                description='Queue the translation and return 202 '
+                            'instead of translating within the request.',
+            ),
+            OpenApiParameter(
+                'stream',
+                OpenApiTypes.INT, enum=[0, 1],
+                description='Stream translated segments as NDJSON, '
+                            'followed by the saved translation.',
+            ),
+        ]
+    )
+)
 class TranslationViewSet(viewsets.ModelViewSet):
     """View for manage translation APIs."""
     serializer_class = serializers.TranslationSerializer
     queryset = Translation.objects.all()
     authentication_classes = [TokenAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = TranslationCursorPagination
+
+    def perform_authentication(self, request):
+        with phase('auth'):
+            super().perform_authentication(request)
+        profiling.authenticated(request.user)
+
+    def get_requested_fields(self):
+        """Return the fields requested with ?fields=, if any."""
+        if self.action not in ('list', 'retrieve'):
+            return None
+        fields = self.request.query_params.get('fields')
+        if not fields:
+            return None
+
+        fields = [name for name in fields.split(',') if name]
+        allowed = serializers.TranslationSerializer.Meta.fields
+        unknown = set(fields) - set(allowed)
+        if unknown:
+            raise ValidationError(
+                {'fields': f'Unknown fields: {", ".join(sorted(unknown))}.'}
+            )
+
+        return fields
 
     def get_queryset(self):
         """Retrieve translations for authenticated user."""
-        queryset = self.queryset
-
-        return queryset.filter(
+        queryset = self.queryset.filter(
             user=self.request.user
-        ).order_by('-id').distinct()
+        ).order_by('-id')
+
+        fields = self.get_requested_fields()
+        if fields:
+            # Keep the large text columns out of the query.
+            return queryset.with_content('id', 'updated_at', *fields)
+
+        return queryset.with_content()
+
+    def is_conditional(self):
+        """Return whether the request may be answered with a 304.
+
+        Only If-None-Match is honoured. Last-Modified has a resolution
+        of one second, so a change within the second of the client's
+        copy, or the deletion of a listed row, would go unnoticed.
+        """
+        return 'HTTP_IF_NONE_MATCH' in self.request.META
+
+    def get_validators(self, versions, *extra):
+        """Return the ETag and Last-Modified time of a representation.
+
+        `versions` are (id, updated_at) pairs of the rows it contains.
+        The ETag also covers the negotiated media type, the requested
+        fields and any `extra` values, as they change the response too.
+        """
+        parts = [
+            self.request.accepted_media_type,
+            self.request.query_params.get('fields', ''),
+            *(str(value) for value in extra),
+            *(f'{pk}@{updated_at.isoformat()}' for pk, updated_at in versions),
+        ]
+        etag = hashlib.sha256('\n'.join(parts).encode()).hexdigest()[:32]
+        last_modified = max(
+            (updated_at for _, updated_at in versions), default=None
+        )
+
+        # HTTP dates have a resolution of one second; round up.
+        return f'"{etag}"', last_modified and \
+            math.ceil(last_modified.timestamp())
+
+    def not_modified(self, etag, last_modified):
+        """Return a 304 response if the client's copy is current.
+
+        The decision rests on the ETag alone, see `is_conditional`.
+        """
+        response = get_conditional_response(self.request, etag=etag)
+        if response is not None:
+            self.set_validators(response, etag, last_modified)
+
+        return response
+
+    def set_validators(self, response, etag, last_modified):
+        """Add the ETag and Last-Modified headers to a response."""
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        patch_vary_headers(response, ['Accept'])
+
+    def get_page_validators(self, page):
+        """Return the validators of the current list page."""
+        versions = [
+            (row['id'], row['updated_at']) if isinstance(row, dict)
+            else (row.id, row.updated_at)
+            for row in page
+        ]
+
+        return self.get_validators(
+            versions, self.paginator.has_next, self.paginator.has_previous,
+        )
+
+    def list(self, request, *args, **kwargs):
+        """List translations, answering conditional requests cheaply."""
+        if self.is_conditional():
+            # Versions only; the text columns are not loaded.
+            page = self.paginator.paginate_queryset(
+                self.get_queryset().values('id', 'updated_at'),
+                request,
+                view=self,
+            )
+            response = self.not_modified(*self.get_page_validators(page))
+            if response is not None:
+                return response
+
+        response = super().list(request, *args, **kwargs)
+        self.set_validators(
+            response, *self.get_page_validators(self.paginator.page)
+        )
+
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        """Retrieve a translation, answering conditional requests cheaply."""
+        if self.is_conditional():
+            # Version only; the text columns are not loaded.
+            row = get_object_or_404(
+                self.get_queryset().values('id', 'updated_at'),
+                **{self.lookup_field: self.kwargs[self.lookup_field]},
+            )
+            response = self.not_modified(
+                *self.get_validators([(row['id'], row['updated_at'])])
+            )
+            if response is not None:
+                return response
+
+        translation = self.get_object()
+        response = Response(self.get_serializer(translation).data)
+        self.set_validators(response, *self.get_validators(
+            [(translation.id, translation.updated_at)]
+        ))
+
+        return response
+
+    def get_serializer(self, *args, **kwargs):
+        """Return the serializer, limited to the requested fields."""
+        fields = self.get_requested_fields()
+        if fields:
+            kwargs['fields'] = fields
+
+        return super().get_serializer(*args, **kwargs)
 
     def get_serializer_class(self):
         """Return the serializer class for request."""
@@ -45,6 +246,8 @@ class TranslationViewSet(viewsets.ModelViewSet):
             return serializers.TranslationSerializer
         elif self.action == 'upload_image':
             return serializers.TranslationImageSerializer
+        elif self.action == 'job_status':
+            return serializers.TranslationStatusSerializer
 
         return self.serializer_class
 
@@ -53,6 +256,23 @@ class TranslationViewSet(viewsets.ModelViewSet):
             serializer = self.get_serializer(data=request.data)
             serializer.is_valid(raise_exception=True)
 
+            if query_flag(request, 'stream'):
+                translation = Translation(
+                    user=request.user, **serializer.validated_data
+                )
+                return StreamingHttpResponse(
+                    self._stream_translation(translation),
+                    content_type='application/x-ndjson',
+                )
+
+            if query_flag(request, 'async'):
+                # Leave the translation to the translation worker.
+                serializer.save(user=request.user, status=STATUS_PENDING)
+                headers = self.get_success_headers(serializer.data)
+                return Response(serializer.data,
+                                status=status.HTTP_202_ACCEPTED,
+                                headers=headers)
+
             # Call translate_input() method before saving the object.
             translation = serializer.save(user=request.user)
             # translation.translate_input()
@@ -61,6 +281,149 @@ class TranslationViewSet(viewsets.ModelViewSet):
             headers = self.get_success_headers(serializer.data)
             return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
 
+    def _stream_translation(self, translation):
+        """Yield NDJSON records while translating, then save the result."""
+        try:
+            for batch in translation.iter_translate_input():
+                for index, text in batch:
+                    yield json.dumps(
+                        {'segment': index, 'translation': text}
+                    ) + '\n'
+            translation.save(translate=False)
+        except Exception as exc:
+            yield json.dumps({'error': str(exc)}) + '\n'
+            return
+
+        data = self.get_serializer(translation).data
+        yield json.dumps({'translation': data}) + '\n'
+
+    @action(methods=['POST'], detail=False, url_path='bulk')
+    def bulk(self, request):
+        """Create several translations in one request."""
+        items = request.data
+        max_items = getattr(settings, 'TRANSLATION_BULK_MAX_ITEMS', 1000)
+        if not isinstance(items, list) or not 0 < len(items) <= max_items:
+            return Response(
+                {'detail': f'Expected a list of 1 to {max_items} items.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        results = []
+        translations = []
+        for index, item in enumerate(items):
+            serializer = serializers.TranslationSerializer(data=item)
+            if serializer.is_valid():
+                translations.append(
+                    Translation(user=request.user, **serializer.validated_data)
+                )
+                results.append({'index': index})
+            else:
+                results.append({'index': index, 'errors': serializer.errors})
+
+        errors = iter(Translation.objects.bulk_translate(translations))
+        translations = iter(translations)
+        for result in results:
+            if 'errors' in result:
+                continue
+            translation, error = next(translations), next(errors)
+            if error is None:
+                result['id'] = translation.id
+            else:
+                result['errors'] = {'non_field_errors': [error]}
+
+        if any('errors' in result for result in results):
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_201_CREATED
+
+        return Response({'results': results}, status=response_status)
+
+    @extend_schema(
+        request=serializers.TranslationMultiSerializer,
+        responses=serializers.TranslationSerializer(many=True),
+    )
+    @action(methods=['POST'], detail=False, url_path='multi')
+    def multi(self, request):
+        """Translate one input into several target languages."""
+        serializer = serializers.TranslationMultiSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        translations = Translation.objects.create_for_languages(
+            user=request.user, **serializer.validated_data
+        )
+        serializer = serializers.TranslationSerializer(
+            translations, many=True
+        )
+
+        return Response(
+            {'results': serializer.data}, status=status.HTTP_201_CREATED
+        )
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'file_format',
+                OpenApiTypes.STR, enum=[*export.FORMATS],
+                description='Export format; by default the one asked for '
+                            'with Accept, or ndjson.',
+            ),
+            OpenApiParameter(
+                'compress',
+                OpenApiTypes.STR, enum=['gzip'],
+                description='Compress the export with gzip; the default '
+                            'with Accept: application/gzip.',
+            ),
+        ],
+        responses={(200, '*/*'): OpenApiTypes.BINARY},
+    )
+    @action(
+        methods=['GET'], detail=False, url_path='export',
+        renderer_classes=[
+            ORJSONRenderer,
+            NDJSONFileRenderer,
+            CSVFileRenderer,
+            GzipFileRenderer,
+        ],
+    )
+    def export_translations(self, request):
+        """Stream all translations of the user as NDJSON or CSV."""
+        accepted = request.accepted_renderer.format
+        export_format = request.query_params.get(
+            'file_format', accepted if accepted in export.FORMATS else 'ndjson'
+        )
+        if export_format not in export.FORMATS:
+            raise ValidationError({'file_format': 'Expected ndjson or csv.'})
+        compress = request.query_params.get(
+            'compress', 'gzip' if accepted == 'gzip' else None
+        )
+        if compress not in (None, 'gzip'):
+            raise ValidationError({'compress': 'Expected gzip.'})
+
+        rows = export.iter_rows(
+            Translation.objects.filter(user=request.user).order_by('id')
+        )
+        content = export.iter_export(rows, export_format)
+        content_type = export.FORMATS[export_format]
+        filename = f'translations.{export_format}'
+        if compress:
+            content = export.iter_gzip(content)
+            content_type = 'application/gzip'
+            filename += '.gz'
+
+        response = StreamingHttpResponse(content, content_type=content_type)
+        response['Content-Disposition'] = \
+            f'attachment; filename="{filename}"'
+
+        return response
+
+    @action(methods=['GET'], detail=True, url_path='status')
+    def job_status(self, request, pk=None):
+        """Return the status of a translation job."""
+        translation = self.get_object()
+        serializer = self.get_serializer(translation)
+
+        return Response(serializer.data)
+
 
 @extend_schema_view(
     list=extend_schema(
@@ -83,9 +446,7 @@ class BaseTranslationAttrViewSet(mixins.DestroyModelMixin,
 
     def get_queryset(self):
         """Filter queryset to authenticated user."""
-        assigned_only = bool(
-            int(self.request.query_params.get('assigned_only', 0))
-        )
+        assigned_only = query_flag(self.request, 'assigned_only')
         queryset = self.queryset
         if assigned_only:
             queryset = queryset.filter(Translation__isnull=False)
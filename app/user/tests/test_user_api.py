@@ -7,6 +7,7 @@ from django.urls import reverse
 
 from rest_framework.test import APIClient
 from rest_framework import status
+from rest_framework.authtoken.models import Token
 
 
 CREATE_USER_URL = reverse('user:create')
@@ -147,3 +148,35 @@ class PrivateUserApiTests(TestCase):
         self.assertEqual(self.user.name, payload['name'])
         self.assertTrue(self.user.check_password(payload['password']))
         self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+
+class UserApiQueryCountTests(TestCase):
+    """Test the number of queries of the user API."""
+
+    def setUp(self):
+        self.user = create_user(
+            email='test@example.com',
+            password='testpass123',
+            name='Test Name',
+        )
+        self.client = APIClient()
+
+    def test_me_query_count(self):
+        """Test retrieving the profile only looks up the token."""
+        token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + token.key)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_token_query_count(self):
+        """Test fetching an existing token looks up user and token."""
+        Token.objects.create(user=self.user)
+        payload = {'email': 'test@example.com', 'password': 'testpass123'}
+
+        with self.assertNumQueries(2):
+            res = self.client.post(TOKEN_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)